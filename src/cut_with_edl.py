@@ -4,18 +4,53 @@
 OPTIMIZED VERSION with memory-efficient concat demuxer for large files.
 """
 
+import argparse
+import asyncio
+import bisect
+import contextlib
+import functools
+import inspect
+import json
 import os
+import re
 import subprocess
 import sys
 import tempfile
 import shutil
+import threading
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 
 # Blacklist path for permanently corrupted files
 # This will be set dynamically based on the log file location if provided
 BLACKLIST_FILE = None
 
+# Upper bound for reading TXT sidecars (metadata beyond this is not useful in tags)
+_SIDECAR_MAX_BYTES = 8192
+
+# EDL line: "<start> <end> <action>" (whitespace separated, '#' starts a
+# comment; a UTF-8 BOM in front of the first line is skipped)
+_EDL_LINE_RE = re.compile(r"^\ufeff?\s*([\d.+eE-]+)\s+([\d.+eE-]+)\s+(\S+)")
+# Non-comment EDL line whose third column is exactly "0" (commercial)
+_EDL_COMMERCIAL_RE = re.compile(rb"(?m)^[ \t]*[^#\s]\S*[ \t]+\S+[ \t]+0(?=\s|$)")
+# Same pattern for a whole EDL buffer at once (one C-level scan, no line split)
+_EDL_BUFFER_RE = re.compile(rb"(?m)^(?:\xef\xbb\xbf)?[ \t]*([\d.+eE-]+)[ \t]+([\d.+eE-]+)[ \t]+(\S+)")
+
+# Invariant argv pieces shared by every FFmpeg invocation below
+_FFMPEG_PREFIX = ("ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error")
+_AAC_AUDIO_ARGS = ("-c:a", "aac", "-b:a", "192k")
+
+# Larger mux queue: trimmed/concatenated streams with A/V drift otherwise abort
+# with "Too many packets buffered for output stream".
+_MUX_QUEUE_ARGS = ["-max_muxing_queue_size", "4096"]
+
+# Input options for inputs whose stream layout is already known (our own
+# extracted segments): probe 1 MB instead of FFmpeg's 5 MB / 5 s before the
+# first packet. Full recordings keep the default probing so late-starting
+# audio/subtitle PIDs are not dropped.
+_KNOWN_LAYOUT_INPUT_ARGS = ["-probesize", "1M", "-analyzeduration", "1M"]
+
 # --- GPU / Hardware-Video-Encoding (COMSKIP_VENC env) ---
 _ENCODERS_OUT: Optional[str] = None
 
@@ -37,17 +72,24 @@ def _encoder_available(name: str) -> bool:
     return name in _ffmpeg_encoders_output()
 
 
+_NVIDIA_OK: Optional[bool] = None
+
+
 def _nvidia_driver_ok() -> bool:
-    try:
-        r = subprocess.run(
-            ["nvidia-smi", "-L"],
-            capture_output=True,
-            timeout=5,
-            check=False,
-        )
-        return r.returncode == 0 and b"GPU" in r.stdout
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+    # nvidia-smi takes a noticeable moment; probe once per process like the encoder list
+    global _NVIDIA_OK
+    if _NVIDIA_OK is None:
+        try:
+            r = subprocess.run(
+                ["nvidia-smi", "-L"],
+                capture_output=True,
+                timeout=5,
+                check=False,
+            )
+            _NVIDIA_OK = r.returncode == 0 and b"GPU" in r.stdout
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            _NVIDIA_OK = False
+    return _NVIDIA_OK
 
 
 def _vaapi_device_path() -> Optional[str]:
@@ -87,7 +129,7 @@ def resolve_video_profile(for_filter_complex: bool, log_file: Optional[str]) ->
     profile = _resolve_venc_from_env(os.environ.get("COMSKIP_VENC", "auto"))
     if for_filter_complex and profile == "vaapi":
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(
                     "[ENCODE] VAAPI mit filter_complex nicht unterstützt — nutze libx264\n"
                 )
@@ -101,7 +143,7 @@ def build_video_encode_args(profile: str) -> List[str]:
         return ["-c:v", "libx264", "-crf", "21", "-preset", "faster"]
     if profile == "nvenc":
         cq = os.environ.get("COMSKIP_NVENC_CQ", "23")
-        return ["-c:v", "h264_nvenc", "-preset", "p4", "-cq", cq, "-b:v", "0"]
+        return ["-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", cq, "-b:v", "0"]
     if profile == "vaapi":
         dev = os.environ.get("COMSKIP_VAAPI_DEVICE", "/dev/dri/renderD128")
         qp = os.environ.get("COMSKIP_VAAPI_QP", "23")
@@ -124,10 +166,134 @@ def build_video_encode_args(profile: str) -> List[str]:
 def log_encode_profile(profile: str, log_file: Optional[str]) -> None:
     if not log_file:
         return
-    with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+    with _open_log(log_file) as f:
         f.write(f"[ENCODE] Video-Profil: {profile}\n")
 
 
+# Log handles kept open for the duration of one cut_video call, keyed by path.
+# Helpers write through _open_log(), which reuses the session handle instead of
+# an open/close pair (and a fresh buffer) per log line.
+_OPEN_LOGS: Dict[str, TextIO] = {}
+# Sessions sharing each log path (cut_videos_async runs cuts in threads)
+_OPEN_LOG_USERS: Dict[str, int] = {}
+_OPEN_LOGS_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _open_log(log_file: str) -> Iterator[TextIO]:
+    """Yield an append handle for log_file (the session handle if one is active).
+
+    The session handle is opened on the first write, so a cut that fails
+    validation before logging anything never touches the log file.
+    """
+    fh = _OPEN_LOGS.get(log_file)
+    if fh is None and log_file in _OPEN_LOG_USERS:
+        with _OPEN_LOGS_LOCK:
+            fh = _OPEN_LOGS.get(log_file)
+            if fh is None and log_file in _OPEN_LOG_USERS:
+                fh = open(log_file, "a", encoding="utf-8", errors="ignore", buffering=1 << 15)
+                _OPEN_LOGS[log_file] = fh
+    if fh is not None:
+        yield fh
+        return
+    with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+        yield f
+
+
+@contextlib.contextmanager
+def _log_session(log_file: Optional[str]) -> Iterator[None]:
+    """Keep log_file open (buffered) for all log writes inside the block.
+
+    Nested or concurrent sessions on the same file share the handle; the
+    last one to leave closes it.
+    """
+    if not log_file:
+        yield
+        return
+    with _OPEN_LOGS_LOCK:
+        _OPEN_LOG_USERS[log_file] = _OPEN_LOG_USERS.get(log_file, 0) + 1
+    try:
+        yield
+    finally:
+        with _OPEN_LOGS_LOCK:
+            _OPEN_LOG_USERS[log_file] -= 1
+            if not _OPEN_LOG_USERS[log_file]:
+                del _OPEN_LOG_USERS[log_file]
+                fh = _OPEN_LOGS.pop(log_file, None)
+                if fh is not None:
+                    fh.close()
+
+
+def _flush_log(log_file: Optional[str]) -> None:
+    """Flush pending session writes before a child process appends to the log."""
+    fh = _OPEN_LOGS.get(log_file) if log_file else None
+    if fh is not None:
+        fh.flush()
+
+
+def _run_logged(cmd: List[str], log_file: Optional[str]) -> int:
+    """Run cmd with stdout/stderr going straight to log_file; returns exit code.
+
+    The child gets a raw O_APPEND descriptor, so no Python file object sits
+    between FFmpeg and the log (no buffering, no interleaving with headers
+    still pending in a Python-side buffer). Without log_file the output is
+    inherited.
+    """
+    if not log_file:
+        return subprocess.run(cmd, check=False).returncode
+    _flush_log(log_file)
+    logfd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        return subprocess.run(cmd, stdout=logfd, stderr=logfd, check=False).returncode
+    finally:
+        os.close(logfd)
+
+
+def _run_ffmpeg(
+    cmd: List[str],
+    log_file: Optional[str],
+    log_lock: Optional[threading.Lock] = None,
+    header: str = "",
+) -> int:
+    """Run cmd capturing stdout/stderr, then append header + output to log_file in one go.
+
+    For parallel workers: each child writes into its own anonymous temp file
+    and the worker blocks in Popen.wait() (GIL released). The header and the
+    captured output are appended together under log_lock afterwards, so
+    concurrent FFmpeg runs never interleave inside the log.
+    """
+    if not log_file:
+        return subprocess.run(cmd, check=False).returncode
+    # Plain TemporaryFile rather than SpooledTemporaryFile: Popen needs a real
+    # descriptor, and fileno() would force a spooled file to disk anyway.
+    with tempfile.TemporaryFile() as out:
+        proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT)
+        rc = proc.wait()
+        out.seek(0)
+        captured = out.read()
+    if header or captured:
+        entry = header.encode("utf-8", "ignore") + captured
+        if log_lock is not None:
+            log_lock.acquire()
+        try:
+            _flush_log(log_file)
+            with open(log_file, "ab") as f:
+                f.write(entry)
+        finally:
+            if log_lock is not None:
+                log_lock.release()
+    return rc
+
+
+def _ffmpeg_threads() -> Optional[int]:
+    """Threads per encoding FFmpeg run (COMSKIP_FFMPEG_THREADS); None = FFmpeg's auto."""
+    try:
+        threads = int(os.environ.get("COMSKIP_FFMPEG_THREADS", "0"))
+    except ValueError:
+        return None
+    return threads if threads > 0 else None
+
+
 def run_ffmpeg_with_profile_fallback(
     cmd_prefix: List[str],
     cmd_suffix: List[str],
@@ -145,18 +311,19 @@ def run_ffmpeg_with_profile_fallback(
     last_rc = 1
     for p in profiles:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[ENCODE] Versuch: {p}\n")
         cmd = list(cmd_prefix)
         cmd.extend(build_video_encode_args(p))
+        threads = _ffmpeg_threads()
+        if threads:
+            cmd.extend(["-threads", str(threads)])
         cmd.extend(cmd_suffix)
         try:
             if log_file:
-                with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+                with _open_log(log_file) as f:
                     f.write("[ENCODE] FFmpeg cmd: " + " ".join(cmd) + "\n")
-                    last_rc = subprocess.run(cmd, stdout=f, stderr=f, check=False).returncode
-            else:
-                last_rc = subprocess.run(cmd, check=False).returncode
+            last_rc = _run_logged(cmd, log_file)
         except FileNotFoundError:
             return 7
 
@@ -164,7 +331,7 @@ def run_ffmpeg_with_profile_fallback(
             return 0
 
         if p != "cpu" and log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(
                     f"[ENCODE] Hardware-Encode fehlgeschlagen (rc={last_rc}), "
                     "Fallback auf CPU...\n"
@@ -183,6 +350,24 @@ def print_venc_probe() -> None:
     print(f"  h264_vaapi in ffmpeg: {_encoder_available('h264_vaapi')}")
     print(f"  h264_qsv in ffmpeg:   {_encoder_available('h264_qsv')}")
 
+def _stat_or_none(path: Optional[str]) -> Optional[os.stat_result]:
+    """Single stat() per path; None if path is empty or not accessible."""
+    if not path:
+        return None
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _remove_quietly(path: str) -> None:
+    """Delete path if present (one unlink instead of exists() + remove())."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
 def get_blacklist_path(log_file: Optional[str] = None) -> str:
     """Determine blacklist file path from log file location or use default."""
     if log_file:
@@ -192,40 +377,51 @@ def get_blacklist_path(log_file: Optional[str] = None) -> str:
 
 
 def edl_has_no_commercials(edl_file: str) -> bool:
-    """Check if an EDL file contains no commercial segments."""
+    """Check if an EDL file contains no commercial segments.
+
+    One regex scan looks for a non-comment line whose third column is
+    exactly "0". An unreadable EDL counts as "no commercials".
+    """
     try:
-        with open(edl_file, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                parts = line.split()
-                if len(parts) >= 3:
-                    try:
-                        action = parts[2]
-                        if action == "0":
-                            return False
-                    except (ValueError, IndexError):
-                        continue
-        return True
+        with open(edl_file, "rb") as f:
+            return _EDL_COMMERCIAL_RE.search(f.read()) is None
     except (OSError, IOError):
         return True
 
 
-def is_blacklisted(input_file: str, log_file: Optional[str] = None) -> bool:
-    """Check if file is in the corruption blacklist."""
-    blacklist_file = get_blacklist_path(log_file)
-    if not os.path.exists(blacklist_file):
-        return False
-    basename = os.path.basename(input_file)
+# Parsed blacklists: path -> (mtime_ns, size, entries). A changed file reloads.
+_BLACKLIST_CACHE: Dict[str, Tuple[int, int, frozenset]] = {}
+
+
+def _load_blacklist(blacklist_file: str) -> frozenset:
+    """Blacklist entries (basenames as bytes), read once per file version."""
+    st = _stat_or_none(blacklist_file)
+    if st is None:
+        _BLACKLIST_CACHE.pop(blacklist_file, None)
+        return frozenset()
+    cached = _BLACKLIST_CACHE.get(blacklist_file)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
     try:
-        with open(blacklist_file, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip() == basename:
-                    return True
+        with open(blacklist_file, "rb") as f:
+            data = f.read()
     except (OSError, IOError):
-        pass
-    return False
+        return frozenset()
+    entries = frozenset(line.rstrip(b" \t\r") for line in data.split(b"\n"))
+    _BLACKLIST_CACHE[blacklist_file] = (st.st_mtime_ns, st.st_size, entries)
+    return entries
+
+
+def is_blacklisted(input_file: str, log_file: Optional[str] = None) -> bool:
+    """Check if file is in the corruption blacklist (whole-line basename match).
+
+    The blacklist is loaded into a set once and reused until the file
+    changes, so batch runs don't rescan it for every recording.
+    """
+    needle = os.path.basename(input_file).encode("utf-8")
+    if not needle:
+        return False
+    return needle in _load_blacklist(get_blacklist_path(log_file))
 
 
 def add_to_blacklist(input_file: str, log_file: Optional[str] = None) -> None:
@@ -236,10 +432,11 @@ def add_to_blacklist(input_file: str, log_file: Optional[str] = None) -> None:
         os.makedirs(os.path.dirname(blacklist_file), exist_ok=True)
         with open(blacklist_file, "a", encoding="utf-8") as f:
             f.write(f"{basename}\n")
+        _BLACKLIST_CACHE.pop(blacklist_file, None)
         msg = f"Added to corruption blacklist: {basename}"
         print(msg, file=sys.stderr)
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+            with _open_log(log_file) as f_log:
                 f_log.write(f"[BLACKLIST] {msg}\n")
     except (OSError, IOError) as e:
         print(f"Warning: Could not write blacklist: {e}", file=sys.stderr)
@@ -250,10 +447,12 @@ def repair_corrupted_file(input_file: str, log_file: Optional[str] = None) -> Op
     
     Returns path to repaired file if successful, None otherwise.
     """
-    temp_repaired = tempfile.mktemp(suffix=".ts", prefix="repaired_")
+    # mkstemp reserves the name atomically (mktemp is racy); FFmpeg overwrites it via -y
+    fd, temp_repaired = tempfile.mkstemp(suffix=".ts", prefix="repaired_")
+    os.close(fd)
     
     if log_file:
-        with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+        with _open_log(log_file) as f:
             f.write(f"\n[REPAIR] Attempting to repair corrupted file: {os.path.basename(input_file)}\n")
     
     # Try repair with error tolerance
@@ -267,111 +466,146 @@ def repair_corrupted_file(input_file: str, log_file: Optional[str] = None) -> Op
     
     try:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write("[REPAIR] Running: ffmpeg -err_detect ignore_err -i <file> -c copy\n")
-                rc = subprocess.run(cmd, stdout=f, stderr=f, check=False).returncode
+            rc = _run_logged(cmd, log_file)
         else:
             rc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False).returncode
         
-        if rc == 0 and os.path.exists(temp_repaired) and os.path.getsize(temp_repaired) > 1024:
+        repaired_stat = _stat_or_none(temp_repaired)
+        if rc == 0 and repaired_stat is not None and repaired_stat.st_size > 1024:
             # Verify repaired file works
             verify_cmd = ["ffprobe", "-v", "error", temp_repaired]
             verify_rc = subprocess.run(verify_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False).returncode
             
             if verify_rc == 0:
                 if log_file:
-                    with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+                    with _open_log(log_file) as f:
                         f.write("[REPAIR] ✓ Repair successful, using repaired file\n")
                 return temp_repaired
         
         # Cleanup failed repair
-        if os.path.exists(temp_repaired):
-            os.remove(temp_repaired)
+        _remove_quietly(temp_repaired)
         
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[REPAIR] ✗ Repair failed (rc={rc}), file is permanently corrupted\n")
         
         return None
         
     except Exception as e:
-        if os.path.exists(temp_repaired):
-            os.remove(temp_repaired)
+        _remove_quietly(temp_repaired)
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[REPAIR] ✗ Exception during repair: {e}\n")
         return None
 
 
-def parse_edl_lines(lines: List[str]) -> List[Tuple[float, float, str]]:
-    """Parse EDL file lines into structured cut information."""
-    cuts = []
+def _iter_edl_cuts(lines: Iterable[str]) -> Iterator[Tuple[float, float, str]]:
+    """Yield (start, end, action) for each valid EDL line."""
+    match = _EDL_LINE_RE.match
     for line in lines:
-        line = line.strip()
-        if not line or line.startswith("#"):
+        # Comments and blank lines never match the numeric first column
+        m = match(line)
+        if m is None:
             continue
-        parts = line.split()
-        if len(parts) < 3:
+        try:
+            start = float(m.group(1))
+            end = float(m.group(2))
+        except ValueError:
             continue
+        yield (start, end, m.group(3))
+
+
+def _iter_edl_cuts_from_bytes(buf: bytes) -> Iterator[Tuple[float, float, str]]:
+    """Yield (start, end, action) from a raw EDL buffer (bytes)."""
+    for m in _EDL_BUFFER_RE.finditer(buf):
         try:
-            start = float(parts[0])
-            end = float(parts[1])
-            action = parts[2]
-            cuts.append((start, end, action))
+            start = float(m.group(1))
+            end = float(m.group(2))
         except ValueError:
             continue
-    return cuts
+        yield (start, end, m.group(3).decode("ascii", "ignore"))
+
+
+def _iter_keep_segments(
+    cuts: Iterable[Tuple[float, float, str]],
+) -> Iterator[Tuple[float, Optional[float]]]:
+    """Yield the segments to keep between commercial cuts (action '0').
+
+    Non-commercial rows are masked out up front. Back-to-back or overlapping
+    breaks are merged, so no zero-length (or sub-microsecond) keep segment
+    ever becomes an extra concat input.
+    """
+    breaks = ((start, end) for start, end, action in cuts if action == "0")
+    last_end = 0.0
+    for start, end in breaks:
+        if start - last_end > 1e-6:
+            yield (last_end, start)
+        # A break nested in the previous one must not pull last_end back
+        last_end = max(last_end, end)
+    yield (last_end, None)
+
+
+def parse_edl_lines(lines: Iterable[str]) -> List[Tuple[float, float, str]]:
+    """Parse EDL file lines into structured cut information."""
+    return list(_iter_edl_cuts(lines))
 
 
 def keep_segments_from_cuts(
-    cuts: List[Tuple[float, float, str]],
+    cuts: Iterable[Tuple[float, float, str]],
 ) -> List[Tuple[float, Optional[float]]]:
     """Convert commercial cut points into segments to keep."""
-    keep_segments: List[Tuple[float, Optional[float]]] = []
-    last_end = 0.0
-    for start, end, action in cuts:
-        if action == "0":
-            if start > last_end:
-                keep_segments.append((last_end, start))
-            last_end = end
-    keep_segments.append((last_end, None))
-    return keep_segments
+    return list(_iter_keep_segments(cuts))
+
+
+def keep_segments_from_edl(edl_file: str) -> Optional[List[Tuple[float, Optional[float]]]]:
+    """Read an EDL file once and return its keep segments.
+
+    Returns None if the EDL has no commercials (or can't be read), the same
+    verdict as edl_has_no_commercials, without opening the file twice.
+    A missing EDL raises FileNotFoundError.
+    """
+    try:
+        with open(edl_file, "rb") as f:
+            buf = f.read()
+    except FileNotFoundError:
+        raise
+    except (OSError, IOError):
+        return None
+    if _EDL_COMMERCIAL_RE.search(buf) is None:
+        return None
+    return list(_iter_keep_segments(_iter_edl_cuts_from_bytes(buf)))
+
+
+# TXT sidecar keys (lower-cased) -> metadata field; "description" is handled separately
+_TXT_METADATA_KEYS = {"channel": "channel", "date": "date", "recording": "recording"}
 
 
 def parse_txt_metadata(file_path: str) -> Dict[str, str]:
     """Parse metadata from a text sidecar."""
     meta: Dict[str, str] = {}
-    if not os.path.exists(file_path):
-        return meta
-
     description_lines: List[str] = []
-    in_description = False
     try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as fh:
-            for raw_line in fh:
-                line = raw_line.rstrip("\n")
-                if not in_description:
-                    if ":" in line:
-                        key_part, value_part = line.split(":", 1)
-                        key = key_part.strip().lower()
-                        value = value_part.strip()
-                        if key == "description":
-                            in_description = True
-                            if value:
-                                description_lines.append(value)
-                            continue
-                        if key == "channel":
-                            meta["channel"] = value
-                            continue
-                        if key == "date":
-                            meta["date"] = value
-                            continue
-                        if key == "recording":
-                            meta["recording"] = value
-                            continue
-                    continue
-                if in_description:
-                    description_lines.append(line)
+        # One bounded read: sidecars are small, longer EPG dumps are truncated
+        with open(file_path, "rb") as fh:
+            text = fh.read(_SIDECAR_MAX_BYTES).decode("utf-8", "ignore")
+        lines = iter(text.splitlines())
+        for line in lines:
+            key_part, sep, value_part = line.partition(":")
+            if not sep:
+                continue
+            key = key_part.strip().lower()
+            if key == "description":
+                # Everything from here on belongs to the description
+                value = value_part.strip()
+                if value:
+                    description_lines.append(value)
+                description_lines.extend(lines)
+                break
+            field = _TXT_METADATA_KEYS.get(key)
+            if field is not None:
+                meta[field] = value_part.strip()
         if description_lines:
             meta["description"] = "\n".join(description_lines).strip()
     except (OSError, IOError):
@@ -379,34 +613,38 @@ def parse_txt_metadata(file_path: str) -> Dict[str, str]:
     return meta
 
 
+_XML_METADATA_TAGS = frozenset(("ArvTitle", "ArvProgLogo", "ArvShortInfo", "ArvLongInfo"))
+
+
 def parse_xml_metadata(file_path: str) -> Dict[str, str]:
     """Parse metadata from an XML sidecar (ArchiveTableArchive format)."""
     meta: Dict[str, str] = {}
-    if not os.path.exists(file_path):
-        return meta
-
+    # Stream the file: only direct children of the root are looked at (like
+    # root.find), each is cleared once handled, and parsing stops as soon as
+    # all wanted tags have been seen.
+    texts: Dict[str, str] = {}
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        title_elem = root.find("ArvTitle")
-        if title_elem is not None and title_elem.text:
-            meta["recording"] = title_elem.text.strip()
-
-        channel_elem = root.find("ArvProgLogo")
-        if channel_elem is not None and channel_elem.text:
-            meta["channel"] = channel_elem.text.strip()
-
-        description_parts: List[str] = []
-
-        short_elem = root.find("ArvShortInfo")
-        if short_elem is not None and short_elem.text:
-            description_parts.append(short_elem.text.strip())
-
-        long_elem = root.find("ArvLongInfo")
-        if long_elem is not None and long_elem.text:
-            description_parts.append(long_elem.text.strip())
-
+        depth = 0
+        for event, elem in ET.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            if elem.tag in _XML_METADATA_TAGS and elem.tag not in texts:
+                texts[elem.tag] = (elem.text or "").strip()
+                if len(texts) == len(_XML_METADATA_TAGS):
+                    break
+            elem.clear()
+
+        if texts.get("ArvTitle"):
+            meta["recording"] = texts["ArvTitle"]
+        if texts.get("ArvProgLogo"):
+            meta["channel"] = texts["ArvProgLogo"]
+        description_parts = [
+            texts[tag] for tag in ("ArvShortInfo", "ArvLongInfo") if texts.get(tag)
+        ]
         if description_parts:
             meta["description"] = "\n\n".join(description_parts)
 
@@ -417,9 +655,21 @@ def parse_xml_metadata(file_path: str) -> Dict[str, str]:
 
 
 def process_metadata(file_path: Optional[str]) -> Dict[str, str]:
-    """Dispatch metadata parsing based on sidecar extension."""
+    """Dispatch metadata parsing based on sidecar extension.
+
+    Results are cached per (path, mtime, size), so batch runs and retries
+    don't re-parse an unchanged sidecar.
+    """
     if not file_path:
         return {}
+    st = _stat_or_none(file_path)
+    if st is None:
+        return {}
+    return dict(_process_metadata_cached(file_path, st.st_mtime_ns, st.st_size))
+
+
+@functools.lru_cache(maxsize=256)
+def _process_metadata_cached(file_path: str, mtime_ns: int, size: int) -> Dict[str, str]:
     if file_path.lower().endswith(".xml"):
         return parse_xml_metadata(file_path)
     if file_path.lower().endswith(".txt"):
@@ -427,10 +677,25 @@ def process_metadata(file_path: Optional[str]) -> Dict[str, str]:
     return {}
 
 
+# Control characters (except tab/newline) dropped from metadata values; a NUL
+# byte makes subprocess refuse the argv, others end up as garbage in the tags.
+_METADATA_CTRL_TABLE = {c: None for c in (*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0D, 0x20), 0x7F)}
+
+
+def _sanitize_metadata_value(value: str) -> str:
+    """Strip control characters from a -metadata value.
+
+    Passed as a separate argv entry, ffmpeg takes everything after the first
+    '=' literally, so ';', '=' and '\\' must NOT be escaped here.
+    """
+    return value.translate(_METADATA_CTRL_TABLE).strip()
+
+
 def build_metadata_flags(meta: Dict[str, str]) -> List[str]:
     """Build ffmpeg -metadata flags from parsed metadata."""
     if not meta:
         return []
+    meta = {key: _sanitize_metadata_value(value) for key, value in meta.items()}
 
     comment_parts: List[str] = []
     title = meta.get("recording")
@@ -458,18 +723,42 @@ def build_metadata_flags(meta: Dict[str, str]) -> List[str]:
     return flags
 
 
+def _build_convert_cmd(
+    working_file: str,
+    srt_file: Optional[str],
+    has_srt: bool,
+    metadata_flags: Optional[List[str]],
+) -> List[str]:
+    """Fresh FFmpeg command prefix (up to the encoder args) for convert_without_cuts.
+
+    Built per attempt, so the repair retry swaps the input without patching
+    tokens in a previous command.
+    """
+    cmd = list(_FFMPEG_PREFIX)
+    cmd.extend(["-err_detect", "ignore_err"])
+    cmd.extend(["-i", working_file])
+    if has_srt:
+        cmd.extend(["-i", srt_file])
+    cmd.extend(["-map", "0:v", "-map", "0:a"])
+    if has_srt:
+        cmd.extend(["-map", "1:0", "-c:s", "srt", "-metadata:s:s:0", "language=ger"])
+    if metadata_flags:
+        cmd.extend(metadata_flags)
+    return cmd
+
+
 def convert_without_cuts(
     input_file: str,
     output_file: str,
     srt_file: Optional[str] = None,
-    txt_file: Optional[str] = None,
+    metadata_flags: Optional[List[str]] = None,
     log_file: Optional[str] = None,
 ) -> int:
     """Convert video to MKV format without cutting commercials.
     
     Includes automatic repair attempt for corrupted files.
     """
-    if not os.path.exists(input_file):
+    if _stat_or_none(input_file) is None:
         print(f"ERROR: input file not found: {input_file}", file=sys.stderr)
         return 3
     
@@ -478,7 +767,7 @@ def convert_without_cuts(
         msg = f"File is blacklisted (permanently corrupted): {os.path.basename(input_file)}"
         print(msg, file=sys.stderr)
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[BLACKLIST] {msg}\n")
         return 9  # New exit code for blacklisted files
     
@@ -488,7 +777,7 @@ def convert_without_cuts(
 
     try:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+            with _open_log(log_file) as f_log:
                 f_log.write(
                     f"\n=== FFmpeg Conversion (No Commercials): "
                     f"{os.path.basename(input_file)} ===\n"
@@ -496,36 +785,20 @@ def convert_without_cuts(
         profile = resolve_video_profile(False, log_file)
         log_encode_profile(profile, log_file)
 
-        def _build_prefix(current_input: str) -> List[str]:
-            cmd_prefix = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
-            cmd_prefix.extend(["-err_detect", "ignore_err"])
-            cmd_prefix.extend(["-i", current_input])
-            has_srt_local = False
-            if srt_file and os.path.exists(srt_file):
-                cmd_prefix.extend(["-i", srt_file])
-                has_srt_local = True
-            cmd_prefix.extend(["-map", "0:v", "-map", "0:a"])
-            if has_srt_local:
-                cmd_prefix.extend(
-                    ["-map", "1:0", "-c:s", "srt", "-metadata:s:s:0", "language=ger"]
-                )
-            if txt_file and os.path.exists(txt_file):
-                meta = process_metadata(txt_file)
-                cmd_prefix.extend(build_metadata_flags(meta))
-            return cmd_prefix
-
-        cmd_suffix = ["-c:a", "aac", "-b:a", "192k", "-y", output_file]
+        has_srt = bool(srt_file) and os.path.exists(srt_file)
+        cmd_suffix = [*_AAC_AUDIO_ARGS, *_MUX_QUEUE_ARGS, "-y", output_file]
         rc = run_ffmpeg_with_profile_fallback(
-            _build_prefix(working_file), cmd_suffix, profile, log_file
+            _build_convert_cmd(working_file, srt_file, has_srt, metadata_flags),
+            cmd_suffix, profile, log_file,
         )
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+            with _open_log(log_file) as f_log:
                 f_log.write(f"\n=== FFmpeg Exit Code: {rc} ===\n")
 
         # If failed, attempt repair
         if rc != 0:
             if log_file:
-                with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+                with _open_log(log_file) as f_log:
                     f_log.write(f"[INFO] First attempt failed (rc={rc}), attempting repair...\n")
             
             repaired_temp_file = repair_corrupted_file(input_file, log_file)
@@ -534,14 +807,15 @@ def convert_without_cuts(
                 # Retry with repaired file
                 working_file = repaired_temp_file
                 if log_file:
-                    with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+                    with _open_log(log_file) as f_log:
                         f_log.write("\n=== Retry with Repaired File ===\n")
 
                 rc = run_ffmpeg_with_profile_fallback(
-                    _build_prefix(working_file), cmd_suffix, profile, log_file
+                    _build_convert_cmd(working_file, srt_file, has_srt, metadata_flags),
+                    cmd_suffix, profile, log_file,
                 )
                 if log_file:
-                    with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+                    with _open_log(log_file) as f_log:
                         f_log.write(
                             f"\n=== FFmpeg Exit Code (after repair): {rc} ===\n\n"
                         )
@@ -559,11 +833,387 @@ def convert_without_cuts(
         return 7
     finally:
         # Cleanup repaired temp file
-        if repaired_temp_file and os.path.exists(repaired_temp_file):
-            try:
-                os.remove(repaired_temp_file)
-            except OSError:
-                pass
+        if repaired_temp_file:
+            _remove_quietly(repaired_temp_file)
+
+
+def _concat_quote(path: str) -> str:
+    """Quote a path for a concat demuxer script (handles apostrophes)."""
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def _copy_max_drift() -> float:
+    """Max. keyframe drift (s) accepted for the stream-copy fast path; 0 = off."""
+    try:
+        return max(0.0, float(os.environ.get("COMSKIP_COPY_MAX_DRIFT", "0")))
+    except ValueError:
+        return 0.0
+
+
+def _probe_start_time(input_file: str) -> float:
+    """Container start_time in seconds (MPEG-TS rarely starts at 0)."""
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=start_time",
+        "-of", "default=noprint_wrappers=1:nokey=1", input_file,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        return float(result.stdout.strip() or 0.0)
+    except (FileNotFoundError, ValueError):
+        return 0.0
+
+
+def _probe_duration(input_file: str) -> Optional[float]:
+    """Container duration in seconds; None if it cannot be probed."""
+    cmd = [
+        "ffprobe", "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", input_file,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        return float(result.stdout.strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def probe_keyframe_times(input_file: str) -> List[float]:
+    """Return sorted video keyframe timestamps relative to the file start.
+
+    Reads packet flags only, so nothing is decoded.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", input_file,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        return []
+    if result.returncode != 0:
+        return []
+
+    offset = _probe_start_time(input_file)
+    times: List[float] = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" not in flags:
+            continue
+        try:
+            times.append(float(pts) - offset)
+        except ValueError:
+            continue
+    times.sort()
+    return times
+
+
+def snap_segments_to_keyframes(
+    keep_segments: List[Tuple[float, Optional[float]]],
+    keyframes: List[float],
+) -> Tuple[List[Tuple[float, Optional[float]]], float]:
+    """Move every segment start back to the nearest keyframe at or before it.
+
+    Returns the snapped segments and the largest start drift in seconds.
+    Drift is infinite if snapping makes a segment overlap its predecessor.
+    """
+    snapped: List[Tuple[float, Optional[float]]] = []
+    max_drift = 0.0
+    prev_end = 0.0
+    for start, end in keep_segments:
+        idx = bisect.bisect_right(keyframes, start) - 1
+        new_start = keyframes[idx] if idx >= 0 else 0.0
+        if new_start < 0.0:
+            new_start = 0.0
+        if snapped and new_start < prev_end:
+            return snapped, float("inf")
+        max_drift = max(max_drift, start - new_start)
+        snapped.append((new_start, end))
+        prev_end = end if end is not None else float("inf")
+    return snapped, max_drift
+
+
+def build_concat_demuxer(
+    keep_segments: List[Tuple[float, Optional[float]]],
+    input_file: str,
+    start_offset: float = 0.0,
+) -> str:
+    """Build a concat demuxer script cutting input_file via inpoint/outpoint.
+
+    start_offset is the container start_time; concat in/outpoints are
+    absolute timestamps while EDL times are relative to the file start.
+    """
+    path = _concat_quote(os.path.abspath(input_file))
+    lines: List[str] = []
+    for start, end in keep_segments:
+        lines.append(f"file {path}\n")
+        if start > 0.0:
+            lines.append(f"inpoint {start + start_offset:.6f}\n")
+        if end is not None:
+            lines.append(f"outpoint {end + start_offset:.6f}\n")
+    return "".join(lines)
+
+
+def plan_stream_copy(
+    input_file: str,
+    keep_segments: List[Tuple[float, Optional[float]]],
+    max_drift: float,
+) -> Optional[List[Tuple[float, Optional[float]]]]:
+    """Keyframe-snapped segments if all cuts are within max_drift, else None."""
+    keyframes = probe_keyframe_times(input_file)
+    if not keyframes:
+        return None
+    snapped, drift = snap_segments_to_keyframes(keep_segments, keyframes)
+    if drift > max_drift:
+        return None
+    return snapped
+
+
+def cut_video_with_stream_copy(
+    input_file: str,
+    keep_segments: List[Tuple[float, Optional[float]]],
+    output_file: str,
+    srt_file: Optional[str] = None,
+    metadata_flags: Optional[List[str]] = None,
+    log_file: Optional[str] = None,
+) -> int:
+    """Cut keyframe-aligned segments without re-encoding (concat demuxer + -c copy).
+
+    keep_segments must already be snapped to keyframes (see plan_stream_copy).
+    """
+    fd, concat_list = tempfile.mkstemp(suffix=".txt", prefix="concat_copy_")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(
+                build_concat_demuxer(keep_segments, input_file, _probe_start_time(input_file))
+            )
+
+        cmd = list(_FFMPEG_PREFIX)
+        cmd.extend(["-f", "concat", "-safe", "0", "-i", concat_list])
+        has_srt = bool(srt_file and os.path.exists(srt_file))
+        if has_srt:
+            cmd.extend(["-i", srt_file])
+        cmd.extend(["-map", "0:v", "-map", "0:a?"])
+        if has_srt:
+            cmd.extend(["-map", "1:0"])
+        cmd.extend(["-c", "copy"])
+        if has_srt:
+            cmd.extend(["-c:s", "srt", "-metadata:s:s:0", "language=ger"])
+        if metadata_flags:
+            cmd.extend(metadata_flags)
+        cmd.extend(["-avoid_negative_ts", "make_zero", *_MUX_QUEUE_ARGS, "-y", output_file])
+
+        if log_file:
+            with _open_log(log_file) as f_log:
+                f_log.write(
+                    f"\n=== FFmpeg Stream Copy (keyframe-aligned): "
+                    f"{os.path.basename(input_file)} ===\n"
+                )
+                f_log.write(f"Keep segments: {len(keep_segments)}\n")
+        rc = _run_logged(cmd, log_file)
+        if log_file:
+            with _open_log(log_file) as f_log:
+                f_log.write(f"\n=== FFmpeg Exit Code: {rc} ===\n\n")
+
+        if rc != 0:
+            print(f"FFmpeg stream copy failed with exit code {rc}", file=sys.stderr)
+            return 6
+        return 0
+    except FileNotFoundError:
+        print("ERROR: ffmpeg not found on PATH", file=sys.stderr)
+        return 7
+    finally:
+        _remove_quietly(concat_list)
+
+
+# Codec pairs whose concat output can be stream-copied instead of re-encoded
+_COPY_VIDEO_CODECS = frozenset({"h264"})
+_COPY_AUDIO_CODECS = frozenset({"aac", "ac3", "eac3"})
+
+
+def _reencode_always() -> bool:
+    """COMSKIP_REENCODE_ALWAYS=1 (or --reencode-always): always re-encode."""
+    return os.environ.get("COMSKIP_REENCODE_ALWAYS", "").strip().lower() in ("1", "true", "yes")
+
+
+def probe_codecs(input_file: str) -> Tuple[Optional[str], Optional[str]]:
+    """(video codec, audio codec) of the first streams, None where absent/unknown.
+
+    Cached per (path, mtime, size), so a recording replaced under the same
+    name during a long batch run is probed again.
+    """
+    st = _stat_or_none(input_file)
+    if st is None:
+        return None, None
+    return _probe_codecs_cached(input_file, st.st_mtime_ns, st.st_size)
+
+
+@functools.lru_cache(maxsize=64)
+def _probe_codecs_cached(
+    input_file: str, mtime_ns: int, size: int
+) -> Tuple[Optional[str], Optional[str]]:
+    codecs: List[Optional[str]] = []
+    for selector in ("v:0", "a:0"):
+        cmd = [
+            "ffprobe", "-v", "error", "-select_streams", selector,
+            "-show_entries", "stream=codec_name", "-of", "csv=p=0", input_file,
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+            name = result.stdout.strip().splitlines()[0].strip() if result.stdout.strip() else ""
+        except FileNotFoundError:
+            name = ""
+        codecs.append(name or None)
+    return codecs[0], codecs[1]
+
+
+def source_is_copy_compatible(input_file: str) -> bool:
+    """True if the source is H.264 with AAC/AC-3 (or no) audio."""
+    vcodec, acodec = probe_codecs(input_file)
+    return vcodec in _COPY_VIDEO_CODECS and (acodec is None or acodec in _COPY_AUDIO_CODECS)
+
+
+def _extract_jobs() -> int:
+    """Parallel segment extractions (COMSKIP_EXTRACT_JOBS, default CPUs / 2, min. 2)."""
+    default = max(2, (os.cpu_count() or 2) // 2)
+    try:
+        jobs = int(os.environ.get("COMSKIP_EXTRACT_JOBS", default))
+    except ValueError:
+        return default
+    return max(1, jobs)
+
+
+def _extract_segment(
+    input_file: str,
+    start: float,
+    end: Optional[float],
+    segment_file: str,
+    index: int,
+    total: int,
+    log_file: Optional[str],
+    log_lock: threading.Lock,
+) -> int:
+    """Stream-copy one keep segment into segment_file; returns the FFmpeg exit code."""
+    # Input-side -ss: demuxer seeks via index to the keyframe before start
+    # instead of reading/discarding everything from the file start.
+    # Duration via -t, since -to after an input seek is relative to the seek.
+    # Times are the EDL's (Comskip cuts are usually keyframe-close anyway).
+    # One thread per side: pure stream copy gains nothing from more, and the
+    # extractions already run in parallel (auto threads would oversubscribe).
+    cmd = list(_FFMPEG_PREFIX)
+    cmd.extend(["-threads", "1", "-ss", str(start), "-i", input_file])
+
+    if end is not None:
+        cmd.extend(["-t", str(end - start)])
+
+    # CRITICAL: Use copy codec to avoid re-encoding (saves RAM and time)
+    cmd.extend([
+        "-c", "copy",
+        "-avoid_negative_ts", "make_zero",
+        "-threads", "1",
+        "-y",
+        segment_file
+    ])
+
+    header = f"Extracting segment {index+1}/{total}: {start} - {end}\n"
+    try:
+        return _run_ffmpeg(cmd, log_file, log_lock, header)
+    except FileNotFoundError:
+        return 7
+
+
+def _segment_scratch_dir(input_file: str) -> Optional[str]:
+    """COMSKIP_SCRATCH_DIR if set and it has room for the segments, else None (TMPDIR).
+
+    Opt-in: a RAM-backed dir such as /dev/shm spares the disk one full
+    write + read of the recording, but parallel workers share it and a full
+    tmpfs fails the extraction. The segments add up to roughly the input
+    size; 1.5x leaves headroom for the concat list and FFmpeg overshoot.
+    """
+    scratch = os.environ.get("COMSKIP_SCRATCH_DIR", "").strip()
+    if not scratch:
+        return None
+    st = _stat_or_none(input_file)
+    if st is None:
+        return None
+    try:
+        vfs = os.statvfs(scratch)
+    except (OSError, AttributeError):
+        return None
+    if vfs.f_bavail * vfs.f_frsize >= 1.5 * st.st_size:
+        return scratch
+    return None
+
+
+def _encode_jobs() -> int:
+    """Parallel segment re-encodes in the concat path (COMSKIP_ENCODE_JOBS, default 1 = off)."""
+    try:
+        jobs = int(os.environ.get("COMSKIP_ENCODE_JOBS", "1"))
+    except ValueError:
+        return 1
+    return max(1, jobs)
+
+
+def _encode_segment(
+    segment_file: str,
+    encoded_file: str,
+    index: int,
+    total: int,
+    threads: int,
+    log_file: Optional[str],
+    log_lock: threading.Lock,
+) -> int:
+    """Re-encode one extracted segment's video with the CPU profile; returns the FFmpeg exit code."""
+    cmd = list(_FFMPEG_PREFIX)
+    cmd.extend(["-fflags", "+genpts", *_KNOWN_LAYOUT_INPUT_ARGS, "-i", segment_file])
+    cmd.extend(["-map", "0:v", "-an"])
+    cmd.extend(build_video_encode_args("cpu"))
+    cmd.extend(["-threads", str(threads)])
+    cmd.extend([*_MUX_QUEUE_ARGS, "-y", encoded_file])
+    header = f"Encoding segment {index+1}/{total}\n"
+    try:
+        return _run_ffmpeg(cmd, log_file, log_lock, header)
+    except FileNotFoundError:
+        return 7
+
+
+def _encode_segments_parallel(
+    segment_files: List[str], jobs: int, log_file: Optional[str]
+) -> Optional[List[str]]:
+    """Re-encode the extracted segments' video side by side; None if any encode fails.
+
+    Every segment starts on a keyframe (stream-copy extraction), so the
+    encoded pieces join cleanly; only rate control restarts per segment.
+    Audio is left out on purpose: AAC adds encoder priming and padding to
+    every encode, so per-segment audio would gap and drift at each join. The
+    caller encodes the audio once over the concatenated original segments.
+    The cores are split between the jobs.
+    """
+    encoded_files = [os.path.splitext(p)[0] + "_enc.ts" for p in segment_files]
+    threads = max(1, (_ffmpeg_threads() or os.cpu_count() or 2) // jobs)
+    log_lock = threading.Lock()
+    failed = False
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                _encode_segment,
+                seg_file, encoded_files[i], i, len(segment_files), threads, log_file, log_lock,
+            ): i
+            for i, seg_file in enumerate(segment_files)
+        }
+        for future in as_completed(futures):
+            rc = future.result()
+            if rc != 0:
+                for pending in futures:
+                    pending.cancel()
+                if log_file:
+                    with log_lock, _open_log(log_file) as f:
+                        f.write(f"WARNING: Segment {futures[future] + 1} encode failed (rc={rc})\n")
+                failed = True
+                break
+    if failed:
+        for path in encoded_files:
+            _remove_quietly(path)
+        return None
+    return encoded_files
 
 
 def cut_video_with_concat_demuxer(
@@ -571,8 +1221,9 @@ def cut_video_with_concat_demuxer(
     keep_segments: List[Tuple[float, Optional[float]]],
     output_file: str,
     srt_file: Optional[str] = None,
-    txt_file: Optional[str] = None,
+    metadata_flags: Optional[List[str]] = None,
     log_file: Optional[str] = None,
+    allow_remux: bool = False,
 ) -> int:
     """Cut video using concat demuxer (MEMORY-EFFICIENT for large files).
     
@@ -581,85 +1232,163 @@ def cut_video_with_concat_demuxer(
     2. Concatenates segments using concat demuxer
     3. Re-encodes only once at the end
     
-    Uses much less RAM than filter_complex approach.
+    Uses much less RAM than filter_complex approach. allow_remux: the cuts
+    passed the keyframe-drift check (plan_stream_copy), so an H.264/AAC
+    source may be remuxed instead of re-encoded. That check only runs with
+    COMSKIP_COPY_MAX_DRIFT set, so the remux is opt-in and only ever a
+    fallback after cut_video_with_stream_copy failed.
     """
     
-    temp_dir = tempfile.mkdtemp(prefix="ffmpeg_segments_")
-    segment_files = []
+    temp_dir = tempfile.mkdtemp(prefix="ffmpeg_segments_", dir=_segment_scratch_dir(input_file))
+    segment_files: List[str] = []
+    encoded_files: List[str] = []
     concat_list = os.path.join(temp_dir, "segments.txt")
+    encoded_list = os.path.join(temp_dir, "encoded.txt")
     
     try:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"\n=== Using concat demuxer (memory-efficient) ===\n")
                 f.write(f"Segments: {len(keep_segments)}\n")
         
-        # Step 1: Extract each segment with stream copy (fast!)
-        for i, (start, end) in enumerate(keep_segments):
-            segment_file = os.path.join(temp_dir, f"segment_{i:03d}.ts")
-            segment_files.append(segment_file)
-            
-            cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
-            cmd.extend(["-i", input_file])
-            cmd.extend(["-ss", str(start)])
-            
-            if end is not None:
-                cmd.extend(["-to", str(end)])
-            
-            # CRITICAL: Use copy codec to avoid re-encoding (saves RAM and time)
-            cmd.extend([
-                "-c", "copy",
-                "-avoid_negative_ts", "make_zero",
-                "-y",
-                segment_file
-            ])
-            
-            if log_file:
-                with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
-                    f.write(f"Extracting segment {i+1}/{len(keep_segments)}: {start} - {end}\n")
-                    rc = subprocess.run(cmd, stdout=f, stderr=f, check=False).returncode
-                    if rc != 0:
-                        f.write(f"WARNING: Segment {i+1} extraction failed (rc={rc})\n")
-                        return 6
-            else:
-                rc = subprocess.run(cmd, check=False).returncode
+        # Step 1: Extract the segments with stream copy (fast!), in parallel.
+        # Every extraction seeks independently; the pool is bounded by
+        # COMSKIP_EXTRACT_JOBS so we never fan out one ffmpeg per segment.
+        segment_files = [
+            os.path.join(temp_dir, f"segment_{i:03d}.ts") for i in range(len(keep_segments))
+        ]
+        log_lock = threading.Lock()
+        workers = min(_extract_jobs(), len(keep_segments))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _extract_segment,
+                    input_file, start, end, segment_files[i], i, len(keep_segments),
+                    log_file, log_lock,
+                ): i
+                for i, (start, end) in enumerate(keep_segments)
+            }
+            for future in as_completed(futures):
+                rc = future.result()
                 if rc != 0:
+                    for pending in futures:
+                        pending.cancel()
+                    if log_file:
+                        with log_lock, _open_log(log_file) as f:
+                            f.write(
+                                f"WARNING: Segment {futures[future] + 1} extraction failed (rc={rc})\n"
+                            )
                     return 6
         
-        # Step 2: Create concat list
-        with open(concat_list, "w", encoding="utf-8") as f:
-            for seg_file in segment_files:
-                # Use absolute path for safety
-                f.write(f"file '{os.path.abspath(seg_file)}'\n")
-        
+        # Source already H.264 + AAC/AC-3 and cuts close to keyframes:
+        # segments are stream copies of it, so the concat can be remuxed.
+        remux = allow_remux and not _reencode_always() and source_is_copy_compatible(input_file)
+        profile: Optional[str] = None
+        if not remux:
+            # Encoding settings (GPU/CPU je nach COMSKIP_VENC, mit CPU-Fallback)
+            profile = resolve_video_profile(False, log_file)
+            log_encode_profile(profile, log_file)
+            # Opt-in: encode the segments' video in parallel (CPU only, GPUs
+            # limit concurrent sessions), then remux it with the audio.
+            jobs = min(_encode_jobs(), len(segment_files))
+            if profile == "cpu" and jobs > 1:
+                if log_file:
+                    with _open_log(log_file) as f:
+                        f.write(f"[ENCODE] {len(segment_files)} Segmente parallel ({jobs} Jobs)\n")
+                encoded_files = _encode_segments_parallel(segment_files, jobs, log_file) or []
+                remux = bool(encoded_files)
+
+        # Step 2: Create concat lists (encoded segments carry video only; the
+        # audio then comes from the original segments, see _encode_segments_parallel)
+        def _write_concat_list(
+            list_file: str, files: List[str], durations: Optional[List[Optional[float]]] = None
+        ) -> None:
+            with open(list_file, "w", encoding="utf-8") as f:
+                for i, seg_file in enumerate(files):
+                    # Use absolute path for safety
+                    f.write(f"file {_concat_quote(os.path.abspath(seg_file))}\n")
+                    if durations and durations[i] is not None:
+                        f.write(f"duration {durations[i]}\n")
+
+        _write_concat_list(concat_list, segment_files)
+        if encoded_files:
+            # The video-only encodes end at their last frame, the originals
+            # usually run a few ms longer on audio. The concat demuxer advances
+            # each input by the file's duration, so give the encoded list the
+            # originals' durations or the two inputs drift apart at every join.
+            durations: List[Optional[float]] = []
+            for seg_file, (start, end) in zip(segment_files, keep_segments):
+                duration = _probe_duration(seg_file)
+                if duration is None and end is not None:
+                    duration = end - start
+                durations.append(duration)
+            _write_concat_list(encoded_list, encoded_files, durations)
+
         # Step 3: Concatenate and re-encode in one pass
-        cmd_prefix = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
-        cmd_prefix.extend(["-f", "concat", "-safe", "0", "-i", concat_list])
-        
-        # Add subtitles if available
-        if srt_file and os.path.exists(srt_file):
-            cmd_prefix.extend(["-i", srt_file])
-            cmd_prefix.extend(["-map", "0:v", "-map", "0:a", "-map", "1:0"])
-            cmd_prefix.extend(["-c:s", "srt", "-metadata:s:s:0", "language=ger"])
-        else:
-            cmd_prefix.extend(["-map", "0"])
-        
-        # Add metadata if available
-        if txt_file and os.path.exists(txt_file):
-            meta = process_metadata(txt_file)
-            cmd_prefix.extend(build_metadata_flags(meta))
-        
-        # Encoding settings (GPU/CPU je nach COMSKIP_VENC, mit CPU-Fallback)
-        profile = resolve_video_profile(False, log_file)
-        log_encode_profile(profile, log_file)
-        cmd_suffix = ["-c:a", "aac", "-b:a", "192k", "-y", output_file]
-        
+        def _concat_cmd(video_list: str, audio_list: Optional[str]) -> List[str]:
+            # Both lists name our own segment files: same input options for each
+            input_args = ["-fflags", "+genpts", *_KNOWN_LAYOUT_INPUT_ARGS, "-thread_queue_size", "1024",
+                          "-f", "concat", "-safe", "0"]
+            cmd_prefix = list(_FFMPEG_PREFIX)
+            cmd_prefix.extend([*input_args, "-i", video_list])
+            if audio_list:
+                cmd_prefix.extend([*input_args, "-i", audio_list])
+            audio_input = 1 if audio_list else 0
+
+            # Add subtitles if available
+            if srt_file and os.path.exists(srt_file):
+                cmd_prefix.extend(["-i", srt_file])
+                cmd_prefix.extend(["-map", "0:v", "-map", f"{audio_input}:a", "-map", f"{audio_input + 1}:0"])
+                cmd_prefix.extend(["-c:s", "srt", "-metadata:s:s:0", "language=ger"])
+            elif audio_list:
+                cmd_prefix.extend(["-map", "0:v", "-map", "1:a?"])
+            else:
+                cmd_prefix.extend(["-map", "0"])
+
+            # Add metadata if available
+            if metadata_flags:
+                cmd_prefix.extend(metadata_flags)
+            return cmd_prefix
+
+        cmd_prefix = _concat_cmd(concat_list, None)
+
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"\nConcatenating {len(segment_files)} segments...\n")
-        rc = run_ffmpeg_with_profile_fallback(cmd_prefix, cmd_suffix, profile, log_file)
+
+        rc = 1
+        if remux:
+            if encoded_files:
+                # Encoded video is copied; audio is encoded once over the joins
+                remux_cmd = _concat_cmd(encoded_list, concat_list)
+                remux_cmd.extend(["-c:v", "copy", *_AAC_AUDIO_ARGS])
+            else:
+                if log_file:
+                    with _open_log(log_file) as f:
+                        f.write("[ENCODE] Quelle H.264/AAC — Stream-Copy ohne Re-Encode\n")
+                remux_cmd = cmd_prefix + ["-c:v", "copy", "-c:a", "copy"]
+            remux_cmd.extend([*_MUX_QUEUE_ARGS, "-y", output_file])
+            try:
+                rc = _run_logged(remux_cmd, log_file)
+            except FileNotFoundError:
+                return 7
+            if rc != 0 and log_file:
+                with _open_log(log_file) as f:
+                    if encoded_files:
+                        f.write(f"[ENCODE] Join der kodierten Segmente fehlgeschlagen (rc={rc}), Re-Encode...\n")
+                    else:
+                        f.write(f"[ENCODE] Stream-Copy fehlgeschlagen (rc={rc}), Re-Encode...\n")
+
+        if rc != 0:
+            # Remux failed (or not possible): encode the original segments once
+            if profile is None:
+                # Encoding settings (GPU/CPU je nach COMSKIP_VENC, mit CPU-Fallback)
+                profile = resolve_video_profile(False, log_file)
+                log_encode_profile(profile, log_file)
+            cmd_suffix = [*_AAC_AUDIO_ARGS, *_MUX_QUEUE_ARGS, "-y", output_file]
+            rc = run_ffmpeg_with_profile_fallback(cmd_prefix, cmd_suffix, profile, log_file)
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"\n=== FFmpeg Exit Code: {rc} ===\n\n")
         
         if rc != 0:
@@ -669,38 +1398,51 @@ def cut_video_with_concat_demuxer(
         return 0
         
     finally:
-        # Cleanup temp files
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        # Cleanup temp files: we know every file we created, so unlink them
+        # directly; rmtree only if something unexpected is left behind.
+        for path in [*segment_files, *encoded_files, concat_list, encoded_list]:
+            _remove_quietly(path)
+        try:
+            os.rmdir(temp_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-def build_filter_complex(keep_segments: List[Tuple[float, Optional[float]]], has_audio: bool = True) -> str:
-    """Build an FFmpeg filter_complex string (for small files only)."""
-    v_filters = []
-    a_filters = []
-    for i, (s, e) in enumerate(keep_segments):
-        end_str = f":end={e}" if e is not None else ""
-        v_filters.append(f"[0:v]trim=start={s}{end_str},setpts=PTS-STARTPTS[v{i}]")
-        if has_audio:
-            a_filters.append(f"[0:a]atrim=start={s}{end_str},asetpts=PTS-STARTPTS[a{i}]")
-
-    filter_parts = []
-    if v_filters:
-        filter_parts.append("; ".join(v_filters) + "; ")
-    if a_filters:
-        filter_parts.append("; ".join(a_filters) + "; ")
-    
+def build_seek_inputs(
+    keep_segments: Sequence[Tuple[float, Optional[float]]], input_file: str
+) -> List[str]:
+    """One input per keep segment: -ss/-t before -i, so FFmpeg seeks via the index.
+
+    Unlike trim=start=X on a single input, nothing before X is decoded. While
+    transcoding, input-side -ss is still frame-accurate (FFmpeg decodes from
+    the preceding keyframe and drops up to X).
+    """
+    args: List[str] = []
+    for start, end in keep_segments:
+        args.extend(["-fflags", "+genpts", "-ss", str(start)])
+        if end is not None:
+            args.extend(["-t", str(end - start)])
+        args.extend(["-i", input_file])
+    return args
+
+
+def build_concat_filter(n: int, has_audio: bool = True) -> str:
+    """Concat filter over the first n inputs (see build_seek_inputs)."""
     if has_audio:
-        concat_inputs = "".join([f"[v{i}][a{i}]" for i in range(len(keep_segments))])
-        filter_parts.append(
-            f"{concat_inputs}concat=n={len(keep_segments)}:v=1:a=1[outv][outa]"
-        )
-    else:
-        concat_inputs = "".join([f"[v{i}]" for i in range(len(keep_segments))])
-        filter_parts.append(
-            f"{concat_inputs}concat=n={len(keep_segments)}:v=1:a=0[outv]"
-        )
-    
-    return "".join(filter_parts)
+        pads = "".join(f"[{i}:v][{i}:a]" for i in range(n))
+        return f"{pads}concat=n={n}:v=1:a=1[outv][outa]"
+    pads = "".join(f"[{i}:v]" for i in range(n))
+    return f"{pads}concat=n={n}:v=1:a=0[outv]"
+
+
+def build_filter_complex(keep_segments: List[Tuple[float, Optional[float]]], has_audio: bool = True) -> str:
+    """Filter graph for cutting keep_segments (kept for existing callers).
+
+    The graph no longer trims a single input: it concatenates one input per
+    segment, so the command needs build_seek_inputs(keep_segments, input_file)
+    in front of it.
+    """
+    return build_concat_filter(len(keep_segments), has_audio)
 
 
 def cut_video_with_filter_complex(
@@ -708,10 +1450,14 @@ def cut_video_with_filter_complex(
     keep_segments: List[Tuple[float, Optional[float]]],
     output_file: str,
     srt_file: Optional[str] = None,
-    txt_file: Optional[str] = None,
+    metadata_flags: Optional[List[str]] = None,
     log_file: Optional[str] = None,
 ) -> int:
-    """Cut video using filter_complex (original method, for small files)."""
+    """Cut video using filter_complex (for small files).
+
+    One fast-seeked input per keep segment (build_seek_inputs) joined by a
+    concat filter, re-encoded in a single FFmpeg run.
+    """
     
     # Check if file has audio stream
     has_audio = True
@@ -722,9 +1468,18 @@ def cut_video_with_filter_complex(
     except:
         pass  # Assume has audio if probe fails
     
-    filter_complex = build_filter_complex(keep_segments, has_audio=has_audio)
+    # Each keep segment is its own fast-seeked input; the graph only concats
+    filter_complex = build_concat_filter(len(keep_segments), has_audio=has_audio)
+
+    # Graph als Skriptdatei übergeben: lange EDLs sprengen sonst ARG_MAX (E2BIG)
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".txt", prefix="filter_complex_", delete=False, encoding="utf-8"
+    ) as f_fc:
+        f_fc.write(filter_complex)
+        filter_script = f_fc.name
     
-    cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-i", input_file]
+    cmd = list(_FFMPEG_PREFIX)
+    cmd.extend(build_seek_inputs(keep_segments, input_file))
 
     if srt_file and os.path.exists(srt_file):
         cmd.extend(["-i", srt_file])
@@ -732,7 +1487,7 @@ def cut_video_with_filter_complex(
     else:
         has_srt = False
 
-    cmd.extend(["-filter_complex", filter_complex])
+    cmd.extend(["-filter_complex_script", filter_script])
     
     if has_audio:
         cmd.extend(["-map", "[outv]", "-map", "[outa]"])
@@ -740,23 +1495,23 @@ def cut_video_with_filter_complex(
         cmd.extend(["-map", "[outv]"])
 
     if has_srt:
-        cmd.extend(["-map", "1:0", "-c:s", "srt", "-metadata:s:s:0", "language=ger"])
+        srt_index = len(keep_segments)
+        cmd.extend(["-map", f"{srt_index}:0", "-c:s", "srt", "-metadata:s:s:0", "language=ger"])
 
-    if txt_file and os.path.exists(txt_file):
-        meta = process_metadata(txt_file)
-        cmd.extend(build_metadata_flags(meta))
+    if metadata_flags:
+        cmd.extend(metadata_flags)
 
     profile = resolve_video_profile(True, log_file)
     log_encode_profile(profile, log_file)
     
     if has_audio:
-        cmd_suffix = ["-c:a", "aac", "-b:a", "192k", "-y", output_file]
+        cmd_suffix = [*_AAC_AUDIO_ARGS, *_MUX_QUEUE_ARGS, "-y", output_file]
     else:
-        cmd_suffix = ["-y", output_file]
+        cmd_suffix = [*_MUX_QUEUE_ARGS, "-y", output_file]
 
     try:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+            with _open_log(log_file) as f_log:
                 f_log.write(
                     f"\n=== FFmpeg Processing (filter_complex): "
                     f"{os.path.basename(input_file)} ===\n"
@@ -765,7 +1520,7 @@ def cut_video_with_filter_complex(
                 f_log.write(f"Audio stream: {'present' if has_audio else 'absent'}\n\n")
         rc = run_ffmpeg_with_profile_fallback(cmd, cmd_suffix, profile, log_file)
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f_log:
+            with _open_log(log_file) as f_log:
                 f_log.write(f"\n=== FFmpeg Exit Code: {rc} ===\n\n")
             
         if rc != 0:
@@ -775,6 +1530,32 @@ def cut_video_with_filter_complex(
     except FileNotFoundError:
         print("ERROR: ffmpeg not found on PATH", file=sys.stderr)
         return 7
+    finally:
+        _remove_quietly(filter_script)
+
+
+def _mem_available_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo in MB, None if not readable (non-Linux)."""
+    try:
+        with open("/proc/meminfo", "r", encoding="ascii", errors="ignore") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def filter_complex_size_limit_mb() -> float:
+    """Largest input (MB) still cut via filter_complex.
+
+    500MB, lowered to 40% of available RAM so the filter graph's peak RSS
+    stays bounded on small workers.
+    """
+    available = _mem_available_mb()
+    if available is None:
+        return 500.0
+    return min(500.0, available * 0.4)
 
 
 def cut_video(
@@ -787,35 +1568,49 @@ def cut_video(
     dry_run: bool = False,
 ) -> int:
     """Main entry point for video processing with intelligent method selection."""
+    with _log_session(log_file):
+        return _cut_video(
+            input_file, edl_file, output_file, srt_file, txt_file, log_file, dry_run
+        )
+
+
+def _cut_video(
+    input_file: str,
+    edl_file: str,
+    output_file: str,
+    srt_file: Optional[str],
+    txt_file: Optional[str],
+    log_file: Optional[str],
+    dry_run: bool,
+) -> int:
     
-    # Validate input
-    if not os.path.exists(input_file):
+    # Validate input (stat once, size is reused for method selection below)
+    input_stat = _stat_or_none(input_file)
+    if input_stat is None:
         print(f"ERROR: input file not found: {input_file}", file=sys.stderr)
         return 3
+
+    # Parse the metadata sidecar once; every cutting path gets the same flags
+    metadata_flags = build_metadata_flags(process_metadata(txt_file))
         
     if not edl_file or edl_file == "none":
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[INFO] No EDL for {os.path.basename(input_file)}. Converting without cuts.\n")
-        return convert_without_cuts(input_file, output_file, srt_file, txt_file, log_file)
+        return convert_without_cuts(input_file, output_file, srt_file, metadata_flags, log_file)
         
-    if not os.path.exists(edl_file):
+    # Parse EDL: one open + read (no separate existence stat) answers
+    # "any commercials?" and yields the keep segments
+    try:
+        keep_segments = keep_segments_from_edl(edl_file)
+    except FileNotFoundError:
         print(f"ERROR: EDL file not found: {edl_file}", file=sys.stderr)
         return 4
-
-    # Check if EDL has no commercials
-    if edl_has_no_commercials(edl_file):
+    if keep_segments is None:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write(f"[INFO] No commercials in EDL for {os.path.basename(input_file)}. Converting without cuts.\n")
-        return convert_without_cuts(input_file, output_file, srt_file, txt_file, log_file)
-
-    # Parse EDL
-    with open(edl_file, "r", encoding="utf-8", errors="ignore") as f:
-        lines = f.readlines()
-
-    cuts = parse_edl_lines(lines)
-    keep_segments = keep_segments_from_cuts(cuts)
+        return convert_without_cuts(input_file, output_file, srt_file, metadata_flags, log_file)
     
     if not keep_segments:
         print("ERROR: No keep segments computed from EDL", file=sys.stderr)
@@ -825,59 +1620,279 @@ def cut_video(
         print(f"Would process {len(keep_segments)} segments")
         return 0
 
+    # STREAM-COPY FAST PATH (opt-in via COMSKIP_COPY_MAX_DRIFT)
+    # If every cut start lies within max_drift seconds after a keyframe,
+    # remux with -c copy instead of decoding and re-encoding.
+    max_drift = _copy_max_drift()
+    keyframe_aligned = False
+    if max_drift > 0:
+        copy_segments = plan_stream_copy(input_file, keep_segments, max_drift)
+        if copy_segments is not None:
+            keyframe_aligned = True
+            result = cut_video_with_stream_copy(
+                input_file, copy_segments, output_file, srt_file, metadata_flags, log_file
+            )
+            if result == 0:
+                return 0
+            if log_file:
+                with _open_log(log_file) as f:
+                    f.write("[INFO] Stream copy failed, falling back to re-encode...\n")
+        elif log_file:
+            with _open_log(log_file) as f:
+                f.write(f"[INFO] Cuts not within {max_drift}s of keyframes, re-encoding\n")
+
     # INTELLIGENT METHOD SELECTION
     # Use concat_demuxer for large files or many segments (memory-efficient)
     # Use filter_complex for small files (faster)
     
-    file_size_mb = os.path.getsize(input_file) / (1024 * 1024)
+    file_size_mb = input_stat.st_size / (1024 * 1024)
     num_segments = len(keep_segments)
     
     # Use concat demuxer if:
     # - More than 5 segments OR
-    # - File larger than 500MB OR
-    # - File larger than 200MB AND more than 3 segments
+    # - File larger than the size limit (500MB, less on low-RAM hosts) OR
+    # - File larger than 40% of that limit AND more than 3 segments
+    size_limit_mb = filter_complex_size_limit_mb()
     use_concat = (
         num_segments > 5 or
-        file_size_mb > 500 or
-        (file_size_mb > 200 and num_segments > 3)
+        file_size_mb > size_limit_mb or
+        (file_size_mb > size_limit_mb * 0.4 and num_segments > 3)
     )
     
     if log_file:
-        with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
-            f.write(f"File size: {file_size_mb:.1f}MB, Segments: {num_segments}\n")
+        with _open_log(log_file) as f:
+            f.write(f"File size: {file_size_mb:.1f}MB, Segments: {num_segments}, "
+                    f"filter_complex limit: {size_limit_mb:.0f}MB\n")
             f.write(f"Method: {'concat_demuxer (memory-efficient)' if use_concat else 'filter_complex (fast)'}\n")
     
     # Try selected method first
     if use_concat:
         result = cut_video_with_concat_demuxer(
-            input_file, keep_segments, output_file, srt_file, txt_file, log_file
+            input_file, keep_segments, output_file, srt_file, metadata_flags, log_file,
+            allow_remux=keyframe_aligned,
         )
     else:
         result = cut_video_with_filter_complex(
-            input_file, keep_segments, output_file, srt_file, txt_file, log_file
+            input_file, keep_segments, output_file, srt_file, metadata_flags, log_file
         )
     
     # If filter_complex failed, try concat_demuxer as fallback
     if result == 6 and not use_concat:
         if log_file:
-            with open(log_file, "a", encoding="utf-8", errors="ignore") as f:
+            with _open_log(log_file) as f:
                 f.write("[INFO] filter_complex failed, retrying with concat_demuxer...\n")
         result = cut_video_with_concat_demuxer(
-            input_file, keep_segments, output_file, srt_file, txt_file, log_file
+            input_file, keep_segments, output_file, srt_file, metadata_flags, log_file,
+            allow_remux=keyframe_aligned,
         )
     
     return result
 
 
+async def cut_video_async(
+    input_file: str,
+    edl_file: Optional[str],
+    output_file: str,
+    srt_file: Optional[str] = None,
+    txt_file: Optional[str] = None,
+    log_file: Optional[str] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> int:
+    """Run cut_video in a worker thread without blocking the event loop.
+
+    Returns cut_video's exit code (1 if it raised). The cuts share this
+    interpreter's module caches; FFmpeg runs as a child process either way.
+    An optional semaphore caps how many cuts run at the same time.
+    """
+    row = [
+        input_file,
+        edl_file or "none",
+        output_file,
+        srt_file or "none",
+        txt_file or "none",
+        log_file or "none",
+    ]
+    if semaphore is None:
+        return await asyncio.to_thread(_run_job_guarded, _cut_one, row)
+    async with semaphore:
+        return await asyncio.to_thread(_run_job_guarded, _cut_one, row)
+
+
+async def cut_videos_async(
+    jobs: Iterable[Sequence[Optional[str]]],
+    max_concurrency: Optional[int] = None,
+) -> List[int]:
+    """Cut several videos concurrently; each job holds cut_video_async's positional args.
+
+    Defaults to half the CPUs since every encode is multi-threaded itself.
+    Returns exit codes in job order.
+    """
+    limit = max_concurrency or max(1, (os.cpu_count() or 2) // 2)
+    semaphore = asyncio.Semaphore(limit)
+    return list(
+        await asyncio.gather(*(cut_video_async(*job, semaphore=semaphore) for job in jobs))
+    )
+
+
+def read_manifest(manifest_file: str) -> List[List[str]]:
+    """Read a batch manifest (TSV, one job per line).
+
+    Columns as for the CLI: input, edl|none, output, [srt], [txt], [log].
+    Blank lines and lines starting with '#' are ignored.
+    """
+    rows: List[List[str]] = []
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            rows.append(line.split("\t"))
+    return rows
+
+
+def _cut_one(row: Sequence[str]) -> int:
+    """Run cut_video for one manifest row ('none' or empty means not given)."""
+    if len(row) < 3:
+        print(f"ERROR: manifest row needs at least 3 columns: {row}", file=sys.stderr)
+        return 2
+    cols = [c if c and c != "none" else None for c in row[:6]]
+    cols.extend([None] * (6 - len(cols)))
+    input_file, edl_file, output_file, srt_file, txt_file, log_file = cols
+    return cut_video(
+        input_file or "", edl_file or "none", output_file or "", srt_file, txt_file, log_file
+    )
+
+
+def _init_batch_worker(threads: int) -> None:
+    """Process-pool initializer: cap FFmpeg threads for this worker's encodes."""
+    os.environ["COMSKIP_FFMPEG_THREADS"] = str(threads)
+
+
+def _run_job_guarded(func, job) -> int:
+    """func(job); an exception is reported and becomes exit code 1 for this job only."""
+    try:
+        return func(job)
+    except Exception as e:
+        print(f"ERROR: job {job!r} failed: {e!r}", file=sys.stderr)
+        return 1
+
+
+def _run_jobs(func, jobs: Sequence, max_workers: Optional[int]) -> List[int]:
+    """Apply func to every job, inline or over a process pool; exit codes in job order.
+
+    max_workers 1 runs the jobs inline; 0 or None means half the CPUs in parallel
+    (every encode is multi-threaded itself). A failing job never stops the others.
+    """
+    workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+    if workers == 1 or len(jobs) <= 1:
+        return [_run_job_guarded(func, job) for job in jobs]
+    # Split the cores between the parallel encodes unless set explicitly
+    threads = _ffmpeg_threads() or max(1, (os.cpu_count() or 2) // workers)
+    results: List[int] = []
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_batch_worker, initargs=(threads,)
+    ) as executor:
+        futures = [executor.submit(_run_job_guarded, func, job) for job in jobs]
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # Worker died or the job could not be sent to it
+                print(f"ERROR: job {job!r} failed: {e!r}", file=sys.stderr)
+                results.append(1)
+    return results
+
+
+def _report_batch(names: Sequence[str], results: Sequence[int]) -> int:
+    """Log failed jobs; returns 0 or the first failing exit code."""
+    for name, rc in zip(names, results):
+        if rc != 0:
+            print(f"[BATCH] Exit {rc}: {name}", file=sys.stderr)
+    return next((rc for rc in results if rc != 0), 0)
+
+
+def run_manifest(manifest_file: str, max_workers: Optional[int] = 1) -> int:
+    """Process all manifest jobs (inline by default, see cut_video_batch); returns 0 or the first failing exit code."""
+    rows = read_manifest(manifest_file)
+    results = _run_jobs(_cut_one, rows, max_workers)
+    return _report_batch([row[0] for row in rows], results)
+
+
+def _cut_job(job: Dict[str, object]) -> int:
+    """Run cut_video(**job); a job with unknown or missing keys is a usage error."""
+    try:
+        inspect.signature(cut_video).bind(**job)
+    except TypeError as e:
+        print(f"ERROR: invalid job {job}: {e}", file=sys.stderr)
+        return 2
+    return cut_video(**job)
+
+
+def cut_video_batch(
+    jobs: Iterable[Dict[str, object]], max_workers: Optional[int] = 1
+) -> List[int]:
+    """Run cut_video for many jobs (dicts of cut_video keyword arguments).
+
+    Default: one job after the other in this interpreter, so module caches
+    (encoder probe, metadata, blacklist) are shared by all jobs instead of
+    being rebuilt per process start; the CLI (--manifest/--jobs-file) uses the
+    same default. max_workers > 1 (0 or None = CPUs / 2) spreads the jobs
+    over a process pool. Returns the exit codes in job order.
+    """
+    return _run_jobs(_cut_job, list(jobs), max_workers)
+
+
+def read_jobs_file(jobs_file: str) -> List[Dict[str, object]]:
+    """Read a JSON jobs file: a list of objects with cut_video keyword arguments."""
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        jobs = json.load(f)
+    if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+        raise ValueError("expected a JSON list of objects")
+    return jobs
+
+
+def _main_batch(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="cut_with_edl.py", description="Cut several videos in one process."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="TSV file, one job per line")
+    source.add_argument("--jobs-file", help="JSON list of cut_video keyword arguments")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="parallel jobs (default: 1, inline; 0 = CPUs / 2)",
+    )
+    args = parser.parse_args(argv)
+    if args.manifest:
+        return run_manifest(args.manifest, args.workers)
+    try:
+        jobs = read_jobs_file(args.jobs_file)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: jobs file {args.jobs_file}: {e}", file=sys.stderr)
+        return 2
+    results = cut_video_batch(jobs, args.workers)
+    return _report_batch([str(job.get("input_file", "?")) for job in jobs], results)
+
+
 if __name__ == "__main__":
     if len(sys.argv) == 2 and sys.argv[1] == "--probe-venc":
         print_venc_probe()
         sys.exit(0)
 
+    if "--reencode-always" in sys.argv:
+        sys.argv.remove("--reencode-always")
+        os.environ["COMSKIP_REENCODE_ALWAYS"] = "1"
+
+    # Batch flags may come in any order (e.g. --workers 2 --manifest jobs.tsv)
+    if any(arg.startswith(("--manifest", "--jobs-file", "--workers")) for arg in sys.argv[1:]):
+        sys.exit(_main_batch(sys.argv[1:]))
+
     if len(sys.argv) < 4:
         print(
             "Usage: cut_with_edl.py <input_video> <edl_file|none> "
-            "<output_file> [srt_file] [txt_file] [log_file]",
+            "<output_file> [srt_file] [txt_file] [log_file] [--reencode-always]\n"
+            "       cut_with_edl.py --manifest <jobs.tsv> [--workers N] [--reencode-always]\n"
+            "       cut_with_edl.py --jobs-file <jobs.json> [--workers N] [--reencode-always]",
             file=sys.stderr,
         )
         sys.exit(2)
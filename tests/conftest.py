@@ -0,0 +1,8 @@
+"""pytest configuration: make ``src.cut_with_edl`` importable from any cwd."""
+
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
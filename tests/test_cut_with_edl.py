@@ -1,103 +1,251 @@
 """Unit tests for cut_with_edl module.
 
-Tests EDL parsing, keep-segment computation, and FFmpeg filter_complex generation.
+Tests EDL parsing, keep-segment computation, and FFmpeg seek/concat generation.
 These tests validate the core logic without requiring FFmpeg or actual video files.
 
 Test coverage:
     - EDL parsing with commercial markers
     - Keep-segment inversion from cut points
-    - FFmpeg filter string construction
+    - FFmpeg seek inputs and concat filter construction
     - Edge cases (empty EDL, multiple commercials)
+    - Pipeline invariants over seeded random EDLs
 
 Usage:
     python -m unittest tests.test_cut_with_edl -v
 """
+import asyncio
+import json
 import os
+import random
+import re
 import shutil
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
+from unittest import mock
 
 import src.cut_with_edl as cut_with_edl
 
-# Ensure the `src` directory is importable when tests are executed from the repo root
-TESTS_DIR = os.path.dirname(__file__)
-PROJECT_ROOT = os.path.abspath(os.path.join(TESTS_DIR, '..'))
-SRC_DIR = os.path.join(PROJECT_ROOT, 'src')
-if SRC_DIR not in sys.path:
-    sys.path.insert(0, SRC_DIR)
+# Open-ended seek (no -t) as the last input; rejects e.g. -ss 50.05
+OPEN_SEEK_FROM_50_RE = re.compile(r"-ss 50\.0 -i in\.ts$")
+OPEN_SEEK_FROM_0_RE = re.compile(r"-ss 0\.0 -i in\.ts$")
+
+
+class TempDirTestCase(unittest.TestCase):
+    """Base class for tests that need files: a fresh self.test_dir per test."""
+
+    def setUp(self):
+        """Create the temporary test directory."""
+        self.test_dir = tempfile.mkdtemp(prefix="tmp_test_")
+
+    def tearDown(self):
+        """Clean up temporary test files."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
 
 
 class TestEDLParsing(unittest.TestCase):
     """Test suite for EDL parsing and filter construction logic.
 
-    Validates the complete pipeline from EDL text to FFmpeg filter_complex string.
-    Tests ensure that commercial segments are correctly identified and inverted
-    into keep-segments, and that the resulting filter strings are valid.
+    Validates the complete pipeline from EDL text to the FFmpeg seek inputs
+    and concat filter used by cut_video_with_filter_complex. Tests ensure that
+    commercial segments are correctly identified and inverted into
+    keep-segments, and that the resulting arguments are valid.
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """Build the EDL fixtures and filter cases shared by the tests."""
+        # Two commercial blocks: 10-20 and 40-50
+        cls.EDL_TWO_BLOCKS = ("10.0 20.0 0\n", "40.0 50.0 0\n")
+        cls.EXPECTED_KEEP = [(0.0, 10.0), (20.0, 40.0), (50.0, None)]
+        # (edl_lines, expected keep segments, bounded seeks, open-ended seek pattern)
+        cls.FILTER_CASES = (
+            (
+                cls.EDL_TWO_BLOCKS,
+                cls.EXPECTED_KEEP,
+                ("-ss 0.0 -t 10.0 -i in.ts", "-ss 20.0 -t 20.0 -i in.ts"),
+                OPEN_SEEK_FROM_50_RE,
+            ),
+            # No commercials detected: a single keep segment covering the whole file
+            ((), [(0.0, None)], (), OPEN_SEEK_FROM_0_RE),
+        )
+
     def test_parse_and_build_filter(self):
-        """Test EDL parsing with multiple commercial blocks.
+        """Test the EDL -> keep segments -> seek inputs + concat filter pipeline.
 
-        Scenario: Video with two commercials at 10-20s and 40-50s.
-        Expected keep segments: 0-10s, 20-40s, 50s-end.
-        Verifies filter_complex contains correct trim points and concat count.
+        Scenarios (see setUpClass): two commercials at 10-20s and 40-50s,
+        and an empty EDL that must pass the whole file through.
+        Verifies the cut count, keep segments, seek points and concat count.
+        """
+        for edl_lines, expected_keep, expected_substrings, open_seek_re in self.FILTER_CASES:
+            with self.subTest(edl_lines=edl_lines):
+                cuts = cut_with_edl.parse_edl_lines(edl_lines)
+                self.assertEqual(len(cuts), len(edl_lines))
+
+                keep = cut_with_edl.keep_segments_from_cuts(cuts)
+                self.assertEqual(keep, expected_keep)
+
+                seeks = " ".join(cut_with_edl.build_seek_inputs(keep, "in.ts"))
+                missing = [s for s in expected_substrings if s not in seeks]
+                self.assertFalse(missing, msg=f"missing in seek inputs: {missing}\n{seeks}")
+                self.assertRegex(seeks, open_seek_re)
+
+                fc = cut_with_edl.build_concat_filter(len(keep))
+                # The concat clause is always the tail of the generated graph
+                self.assertTrue(
+                    fc.endswith(f"concat=n={len(keep)}:v=1:a=1[outv][outa]"),
+                    msg=fc,
+                )
+                # Legacy entry point builds the same graph
+                self.assertEqual(cut_with_edl.build_filter_complex(keep), fc)
+
+    def test_pipeline_invariants_random_edls(self):
+        """Property test over seeded random EDLs.
+
+        Scenario: 200 EDLs with up to 12 raw breaks in 0-10000s, normalized to
+        sorted, non-overlapping commercial lines as comskip writes them.
+        Expected: the seeked durations plus the cuts tile the whole file, there
+        is one keep segment (and input) per gap plus the tail, and the concat
+        takes len(keep) inputs.
+        """
+        total = 10100.0  # past the last possible break end
+        rng = random.Random(20240601)
+        for example in range(200):
+            raw = sorted(
+                tuple(sorted((round(rng.uniform(0, 1e4), 2), round(rng.uniform(0, 1e4), 2))))
+                for _ in range(rng.randint(0, 12))
+            )
+            breaks = []
+            for start, end in raw:
+                if end <= start:
+                    continue
+                if breaks and start <= breaks[-1][1]:
+                    breaks[-1][1] = max(breaks[-1][1], end)
+                else:
+                    breaks.append([start, end])
+            edl_lines = [f"{start} {end} 0\n" for start, end in breaks]
+
+            with self.subTest(example=example, edl_lines=edl_lines):
+                cuts = cut_with_edl.parse_edl_lines(edl_lines)
+                keep = cut_with_edl.keep_segments_from_cuts(cuts)
+                args = cut_with_edl.build_seek_inputs(keep, "in.ts")
+                fc = cut_with_edl.build_concat_filter(len(keep))
+
+                # Kept time as FFmpeg sees it: every -t plus the open-ended last input
+                durations = [float(args[i + 1]) for i, arg in enumerate(args) if arg == "-t"]
+                starts = [float(args[i + 1]) for i, arg in enumerate(args) if arg == "-ss"]
+                kept = sum(durations) + (total - starts[-1])
+                cut = sum(end - start for start, end, _ in cuts)
+                expected_keep = len(breaks) + 1 - (1 if breaks and breaks[0][0] == 0.0 else 0)
+                self.assertEqual(
+                    (round(kept + cut, 6), len(keep), args.count("-i"), fc.endswith(
+                        f"concat=n={len(keep)}:v=1:a=1[outv][outa]")),
+                    (total, expected_keep, expected_keep, True),
+                )
+
+    def test_seek_inputs_replace_trim(self):
+        """Test that every keep segment becomes its own input-side seek.
+
+        Scenario: Two keep segments, the last one open-ended.
+        Expected: -ss/-t before each -i, and a concat over the per-input pads.
+        """
+        keep = [(0.0, 10.0), (20.0, None)]
+        args = cut_with_edl.build_seek_inputs(keep, "in.ts")
+        self.assertEqual(
+            args,
+            [
+                "-fflags", "+genpts", "-ss", "0.0", "-t", "10.0", "-i", "in.ts",
+                "-fflags", "+genpts", "-ss", "20.0", "-i", "in.ts",
+            ],
+        )
+        self.assertEqual(
+            cut_with_edl.build_concat_filter(2),
+            "[0:v][0:a][1:v][1:a]concat=n=2:v=1:a=1[outv][outa]",
+        )
+        self.assertEqual(
+            cut_with_edl.build_concat_filter(2, has_audio=False),
+            "[0:v][1:v]concat=n=2:v=1:a=0[outv]",
+        )
+
+    def test_parse_skips_comments_and_malformed_lines(self):
+        """Test EDL parsing with comments, blank and malformed lines.
+
+        Scenario: Comskip EDL with tab separators mixed with junk lines.
+        Expected: Only the well-formed numeric lines are returned.
         """
-        # Two commercial blocks: 10-20 and 40-50
         edl_lines = [
-            "10.0 20.0 0\n",
-            "40.0 50.0 0\n",
+            "# comskip EDL\n",
+            "\n",
+            "  10.0\t20.0\t0\n",
+            "30.0 40.0\n",
+            "abc def 0\n",
+            "1.2.3 50.0 0\n",
+            "60.0 70.0 0 trailing\n",
         ]
-
         cuts = cut_with_edl.parse_edl_lines(edl_lines)
-        self.assertEqual(len(cuts), 2)
+        self.assertEqual(cuts, [(10.0, 20.0, "0"), (60.0, 70.0, "0")])
 
-        keep = cut_with_edl.keep_segments_from_cuts(cuts)
-        # Expected keep segments: (0,10), (20,40), (50,None)
-        self.assertEqual(len(keep), 3)
-        self.assertEqual(keep[0], (0.0, 10.0))
-        self.assertEqual(keep[1], (20.0, 40.0))
-        self.assertEqual(keep[2], (50.0, None))
-
-        fc = cut_with_edl.build_filter_complex(keep)
-        self.assertIn("trim=start=0.0:end=10.0", fc)
-        self.assertIn("trim=start=20.0:end=40.0", fc)
-        self.assertIn("trim=start=50.0", fc)
-        self.assertIn("concat=n=3", fc)
-
-    def test_empty_edl_creates_full_keep(self):
-        """Test EDL parsing with no commercial markers.
-
-        Scenario: Empty EDL (no commercials detected).
-        Expected: Single keep segment from 0 to end of file.
-        Verifies that videos without commercials pass through unchanged.
+        # The buffer scanner used by cut_video must agree with the line parser
+        raw = "".join(edl_lines).encode("utf-8")
+        self.assertEqual(list(cut_with_edl._iter_edl_cuts_from_bytes(raw)), cuts)
+
+    def test_keep_segments_ignore_other_actions_and_empty_gaps(self):
+        """Test keep-segment inversion with mixed actions.
+
+        Scenario: Back-to-back commercials (20-30, 30-40) plus a mute (action 1).
+        Expected: No zero-length keep segment and the mute row is ignored.
         """
-        edl_lines = []
-        cuts = cut_with_edl.parse_edl_lines(edl_lines)
-        self.assertEqual(cuts, [])
+        cuts = [
+            (0.0, 5.0, "1"),
+            (20.0, 30.0, "0"),
+            (30.0, 40.0, "0"),
+            (50.0, 55.0, "1"),
+        ]
         keep = cut_with_edl.keep_segments_from_cuts(cuts)
-        self.assertEqual(len(keep), 1)
-        self.assertEqual(keep[0], (0.0, None))
-        fc = cut_with_edl.build_filter_complex(keep)
-        self.assertIn("concat=n=1", fc)
+        self.assertEqual(keep, [(0.0, 20.0), (40.0, None)])
+
+    def test_adjacent_and_overlapping_breaks_are_merged(self):
+        """Test that abutting, nested and overlapping breaks yield no empty keeps.
+
+        Scenario: 10-20 and 20-30 abut, 35-60 contains 40-50, 55-70 overlaps.
+        Expected: Keep segments only for the real gaps.
+        """
+        cuts = [
+            (10.0, 20.0, "0"),
+            (20.0, 30.0, "0"),
+            (35.0, 60.0, "0"),
+            (40.0, 50.0, "0"),
+            (55.0, 70.0, "0"),
+        ]
+        self.assertEqual(
+            cut_with_edl.keep_segments_from_cuts(cuts),
+            [(0.0, 10.0), (30.0, 35.0), (70.0, None)],
+        )
+
+    def test_parse_tolerates_byte_order_mark(self):
+        """Test that a UTF-8 BOM does not hide the first EDL line.
+
+        Scenario: EDL saved by an editor that prepends a BOM.
+        Expected: The first commercial is parsed by the line and the bytes parser.
+        """
+        text = "\ufeff10.0 20.0 0\n30.0 40.0 0\n"
+        cuts = [(10.0, 20.0, "0"), (30.0, 40.0, "0")]
+        self.assertEqual(cut_with_edl.parse_edl_lines(text.splitlines(True)), cuts)
+        self.assertEqual(
+            list(cut_with_edl._iter_edl_cuts_from_bytes(text.encode("utf-8"))), cuts
+        )
 
 
-class TestNoCommercialDetection(unittest.TestCase):
+class TestNoCommercialDetection(TempDirTestCase):
     """Test suite for detecting videos with no commercials detected.
 
     Validates the edl_has_no_commercials function that checks if an EDL file
     has any commercial markers. Used to trigger no-cut conversion path.
     """
 
-    def setUp(self):
-        """Create temporary test EDL files."""
-        self.test_dir = os.path.join(PROJECT_ROOT, "tmp_test")
-        os.makedirs(self.test_dir, exist_ok=True)
-
-    def tearDown(self):
-        """Clean up temporary test files."""
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
-
     def test_edl_empty_file(self):
         """Test detection of empty EDL file."""
         edl_path = os.path.join(self.test_dir, "empty.edl")
@@ -133,12 +281,483 @@ class TestNoCommercialDetection(unittest.TestCase):
             f.write("# Start\n10.0 20.0 0\n# Middle\n40.0 50.0 0\n# End\n")
         self.assertFalse(cut_with_edl.edl_has_no_commercials(edl_path))
 
+    def test_edl_with_crlf_tabs_and_other_actions(self):
+        """Test detection with CRLF/tab-separated lines and non-commercial actions."""
+        edl_path = os.path.join(self.test_dir, "mixed.edl")
+        with open(edl_path, "wb") as f:
+            f.write(b"10.0\t20.0\t1\r\n30.0 40.0 00\r\n  # 50.0 60.0 0\r\n")
+        self.assertTrue(cut_with_edl.edl_has_no_commercials(edl_path))
+        with open(edl_path, "ab") as f:
+            f.write(b"70.0\t80.0\t0\r\n")
+        self.assertFalse(cut_with_edl.edl_has_no_commercials(edl_path))
+
     def test_edl_nonexistent_file(self):
         """Test detection on nonexistent file."""
         edl_path = os.path.join(self.test_dir, "nonexistent.edl")
         # Should return True (no commercials) when file cannot be read
         self.assertTrue(cut_with_edl.edl_has_no_commercials(edl_path))
 
+    def test_keep_segments_from_edl_single_read(self):
+        """Test that the fused reader agrees with the check + parse chain."""
+        edl_path = os.path.join(self.test_dir, "fused.edl")
+        with open(edl_path, "w") as f:
+            f.write("# comskip\n10.0\t20.0\t0\n25.0 26.0 1\n40.0 50.0 0\n")
+        self.assertEqual(
+            cut_with_edl.keep_segments_from_edl(edl_path),
+            [(0.0, 10.0), (20.0, 40.0), (50.0, None)],
+        )
+
+        with open(edl_path, "w") as f:
+            f.write("10.0 20.0 1\n")
+        self.assertIsNone(cut_with_edl.keep_segments_from_edl(edl_path))
+        with self.assertRaises(FileNotFoundError):
+            cut_with_edl.keep_segments_from_edl(edl_path + ".missing")
+
+
+class TestBlacklist(TempDirTestCase):
+    """Test suite for the corruption blacklist next to the log file."""
+
+    def setUp(self):
+        """Place the log file in the temporary directory."""
+        super().setUp()
+        self.log_file = os.path.join(self.test_dir, "process.log")
+
+    def test_missing_or_empty_blacklist(self):
+        """Test that nothing is blacklisted without (or with an empty) blacklist."""
+        self.assertFalse(cut_with_edl.is_blacklisted("/videos/a.ts", self.log_file))
+        open(cut_with_edl.get_blacklist_path(self.log_file), "w").close()
+        self.assertFalse(cut_with_edl.is_blacklisted("/videos/a.ts", self.log_file))
+
+    def test_whole_line_match_only(self):
+        """Test that only exact basenames match, not prefixes or suffixes."""
+        cut_with_edl.add_to_blacklist("/videos/show_01.ts", self.log_file)
+        cut_with_edl.add_to_blacklist("/videos/other.ts", self.log_file)
+        self.assertTrue(cut_with_edl.is_blacklisted("/elsewhere/show_01.ts", self.log_file))
+        self.assertTrue(cut_with_edl.is_blacklisted("/videos/other.ts", self.log_file))
+        self.assertFalse(cut_with_edl.is_blacklisted("/videos/show_0.ts", self.log_file))
+        self.assertFalse(cut_with_edl.is_blacklisted("/videos/1.ts", self.log_file))
+        self.assertFalse(cut_with_edl.is_blacklisted("/videos/xshow_01.ts", self.log_file))
+
+
+class TestMetadataFlags(TempDirTestCase):
+    """Test suite for sidecar parsing and ffmpeg -metadata flag construction."""
+
+    def test_parse_txt_sidecar(self):
+        """Test TXT sidecar parsing with CRLF line endings and multi-line description."""
+        txt_path = os.path.join(self.test_dir, "show.txt")
+        with open(txt_path, "w", encoding="utf-8", newline="") as f:
+            f.write("Channel: Das Erste\r\nDate: 2024-01-02\r\nRecording: Tatort\r\n")
+            f.write("Description: Erste Zeile\r\nZweite Zeile\r\n")
+        self.assertEqual(
+            cut_with_edl.parse_txt_metadata(txt_path),
+            {
+                "channel": "Das Erste",
+                "date": "2024-01-02",
+                "recording": "Tatort",
+                "description": "Erste Zeile\nZweite Zeile",
+            },
+        )
+
+    def test_parse_txt_sidecar_is_bounded(self):
+        """Test that oversized descriptions are truncated to the read limit."""
+        txt_path = os.path.join(self.test_dir, "huge.txt")
+        with open(txt_path, "w", encoding="utf-8") as f:
+            f.write("Description: " + "x" * (cut_with_edl._SIDECAR_MAX_BYTES * 4))
+        meta = cut_with_edl.parse_txt_metadata(txt_path)
+        self.assertLess(len(meta["description"]), cut_with_edl._SIDECAR_MAX_BYTES)
+
+    def test_special_characters_survive_and_control_chars_are_dropped(self):
+        """Test that ';', '=' and backslashes are kept verbatim, NUL/ESC removed."""
+        flags = cut_with_edl.build_metadata_flags(
+            {"recording": "Akte X; Teil 1=2\\3\x00", "description": "Zeile 1\r\nZeile 2\x1b"}
+        )
+        self.assertEqual(
+            flags,
+            [
+                "-metadata", "title=Akte X; Teil 1=2\\3",
+                "-metadata", "description=Zeile 1\nZeile 2",
+                "-metadata", "comment=Akte X; Teil 1=2\\3\n\nZeile 1\nZeile 2",
+            ],
+        )
+
+    def test_empty_metadata_yields_no_flags(self):
+        """Test that no flags are emitted without metadata."""
+        self.assertEqual(cut_with_edl.build_metadata_flags({}), [])
+
+    def test_parse_xml_metadata_reads_top_level_tags(self):
+        """Test that only root children count and parsing stops once all tags are seen."""
+        xml_file = os.path.join(self.test_dir, "rec.xml")
+        with open(xml_file, "w", encoding="utf-8") as f:
+            f.write(
+                "<Archive><Extra><ArvTitle>nested</ArvTitle></Extra>"
+                "<ArvTitle> Tatort </ArvTitle><ArvProgLogo>ARD</ArvProgLogo>"
+                "<ArvShortInfo>kurz</ArvShortInfo><ArvLongInfo>lang</ArvLongInfo>"
+                "<trailing"
+            )
+        self.assertEqual(
+            cut_with_edl.parse_xml_metadata(xml_file),
+            {"recording": "Tatort", "channel": "ARD", "description": "kurz\n\nlang"},
+        )
+
+    def test_convert_cmd_uses_working_file_only_as_input(self):
+        """Test that the retry command swaps the input even if metadata repeats the path."""
+        flags = ["-metadata", "comment=/rec/show.ts"]
+        cmd = cut_with_edl._build_convert_cmd("/tmp/repaired.ts", None, False, flags)
+        self.assertEqual(cmd[cmd.index("-i") + 1], "/tmp/repaired.ts")
+        self.assertIn("comment=/rec/show.ts", cmd)
+        self.assertNotIn("1:0", cmd)
+
+
+class TestStreamCopyPlanning(unittest.TestCase):
+    """Test suite for the keyframe-aligned stream-copy fast path.
+
+    Validates snapping of keep-segment starts to keyframes and the generated
+    concat demuxer script, without running ffprobe/ffmpeg.
+    """
+
+    def test_snap_to_previous_keyframe(self):
+        """Test that segment starts move back to the nearest earlier keyframe."""
+        keep = [(0.0, 10.0), (20.0, 40.0), (50.0, None)]
+        keyframes = [0.0, 9.5, 19.75, 39.0, 49.5]
+        snapped, drift = cut_with_edl.snap_segments_to_keyframes(keep, keyframes)
+        self.assertEqual(snapped, [(0.0, 10.0), (19.75, 40.0), (49.5, None)])
+        self.assertAlmostEqual(drift, 0.5)
+
+    def test_snap_overlap_is_rejected(self):
+        """Test that snapping into the previous segment yields infinite drift."""
+        keep = [(0.0, 10.0), (12.0, None)]
+        keyframes = [0.0, 8.0]
+        _, drift = cut_with_edl.snap_segments_to_keyframes(keep, keyframes)
+        self.assertEqual(drift, float("inf"))
+
+    def test_concat_script_uses_absolute_in_and_outpoints(self):
+        """Test concat script generation with a container start offset."""
+        script = cut_with_edl.build_concat_demuxer(
+            [(0.0, 10.0), (20.0, None)], "/videos/it's.ts", start_offset=1.5
+        )
+        self.assertEqual(
+            script,
+            "file '/videos/it'\\''s.ts'\n"
+            "outpoint 11.500000\n"
+            "file '/videos/it'\\''s.ts'\n"
+            "inpoint 21.500000\n",
+        )
+
+
+class TestCopyRouting(TempDirTestCase):
+    """Test suite for codec probing and the remux/re-encode choice of the concat path."""
+
+    def setUp(self):
+        """Create a dummy recording in the temporary directory."""
+        super().setUp()
+        self.input_file = os.path.join(self.test_dir, "rec.ts")
+        with open(self.input_file, "wb") as f:
+            f.write(b"\0" * 188)
+
+    def _fake_ffprobe(self, codecs):
+        """subprocess.run stand-in answering codec_name queries from codecs[selector]."""
+        def run(cmd, **kwargs):
+            selector = cmd[cmd.index("-select_streams") + 1]
+            return subprocess.CompletedProcess(cmd, 0, stdout=codecs.get(selector, "") + "\n")
+        return mock.patch.object(cut_with_edl.subprocess, "run", side_effect=run)
+
+    def test_source_is_copy_compatible(self):
+        """Test the H.264 + AAC/AC-3/none audio whitelist."""
+        cases = [
+            ({"v:0": "h264", "a:0": "aac"}, True),
+            ({"v:0": "h264", "a:0": "ac3"}, True),
+            ({"v:0": "h264"}, True),
+            ({"v:0": "mpeg2video", "a:0": "mp2"}, False),
+            ({"v:0": "h264", "a:0": "mp2"}, False),
+        ]
+        for i, (codecs, expected) in enumerate(cases):
+            with self.subTest(codecs=codecs):
+                # Each case rewrites the file so the (path, mtime, size) key changes
+                with open(self.input_file, "ab") as f:
+                    f.write(b"\0" * (i + 1))
+                with self._fake_ffprobe(codecs):
+                    self.assertEqual(cut_with_edl.source_is_copy_compatible(self.input_file), expected)
+
+    def test_probe_codecs_reprobes_replaced_file(self):
+        """Test that the codec cache is keyed on mtime/size, not just the path."""
+        with self._fake_ffprobe({"v:0": "h264", "a:0": "aac"}) as run:
+            self.assertEqual(cut_with_edl.probe_codecs(self.input_file), ("h264", "aac"))
+            self.assertEqual(cut_with_edl.probe_codecs(self.input_file), ("h264", "aac"))
+            self.assertEqual(run.call_count, 2)
+        with open(self.input_file, "wb") as f:
+            f.write(b"\0" * 376)
+        with self._fake_ffprobe({"v:0": "mpeg2video", "a:0": "mp2"}):
+            self.assertEqual(cut_with_edl.probe_codecs(self.input_file), ("mpeg2video", "mp2"))
+        self.assertEqual(cut_with_edl.probe_codecs(os.path.join(self.test_dir, "gone.ts")), (None, None))
+
+    def _concat_commands(self, allow_remux, env=None):
+        """Run the concat path with FFmpeg stubbed out; returns the concat commands.
+
+        Per-segment encodes (COMSKIP_ENCODE_JOBS) land in self.encode_commands,
+        the concat lists read by each command in self.concat_lists.
+        """
+        commands = []
+        self.encode_commands = []
+        self.concat_lists = {}
+
+        def extract(input_file, start, end, segment_file, *args):
+            open(segment_file, "wb").close()
+            return 0
+
+        def run_ffmpeg(cmd, log_file, log_lock=None, header=""):
+            self.encode_commands.append(cmd)
+            open(cmd[-1], "wb").close()
+            return 0
+
+        def run_logged(cmd, log_file):
+            commands.append(cmd)
+            for path in cmd:
+                if path.endswith(".txt"):
+                    with open(path, encoding="utf-8") as f:
+                        self.concat_lists[os.path.basename(path)] = f.read()
+            return 0
+
+        durations = {"segment_000.ts": 10.04, "segment_001.ts": None}
+
+        with mock.patch.dict(os.environ, env or {}), \
+                mock.patch.object(cut_with_edl, "_extract_segment", side_effect=extract), \
+                mock.patch.object(
+                    cut_with_edl, "_probe_duration",
+                    side_effect=lambda path: durations[os.path.basename(path)],
+                ), \
+                mock.patch.object(cut_with_edl, "_run_logged", side_effect=run_logged), \
+                mock.patch.object(cut_with_edl, "_run_ffmpeg", side_effect=run_ffmpeg), \
+                mock.patch.object(cut_with_edl, "probe_codecs", return_value=("h264", "aac")), \
+                mock.patch.object(cut_with_edl, "resolve_video_profile", return_value="cpu"):
+            rc = cut_with_edl.cut_video_with_concat_demuxer(
+                self.input_file, [(0.0, 10.0), (20.0, None)],
+                os.path.join(self.test_dir, "out.mkv"), allow_remux=allow_remux,
+            )
+        self.assertEqual(rc, 0)
+        return commands
+
+    def test_remux_only_when_allowed_and_not_forced(self):
+        """Test remux for keyframe-checked cuts, re-encode otherwise or with COMSKIP_REENCODE_ALWAYS."""
+        (cmd,) = self._concat_commands(allow_remux=True)
+        self.assertIn("-c:v", cmd)
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "copy")
+
+        for allow_remux, env in ((False, None), (True, {"COMSKIP_REENCODE_ALWAYS": "1"})):
+            with self.subTest(allow_remux=allow_remux, env=env):
+                (cmd,) = self._concat_commands(allow_remux, env)
+                self.assertEqual(cmd[cmd.index("-c:v") + 1], "libx264")
+
+    def test_parallel_encode_encodes_audio_once(self):
+        """Test that segment encodes are video-only and the join encodes audio once."""
+        (cmd,) = self._concat_commands(False, {"COMSKIP_ENCODE_JOBS": "2"})
+        self.assertEqual(len(self.encode_commands), 2)
+        for encode in self.encode_commands:
+            self.assertIn("-an", encode)
+            self.assertNotIn("aac", encode)
+
+        lists = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+        self.assertEqual([os.path.basename(p) for p in lists], ["encoded.txt", "segments.txt"])
+        # Both concat inputs get the same input options
+        first = cmd.index("-i")
+        second = cmd.index("-i", first + 1)
+        video_opts = cmd[len(cut_with_edl._FFMPEG_PREFIX):first]
+        self.assertEqual(cmd[first + 2:second], video_opts)
+        self.assertIn("+genpts", video_opts)
+        self.assertEqual(cmd[cmd.index("-map"):cmd.index("-map") + 4], ["-map", "0:v", "-map", "1:a?"])
+        self.assertEqual(cmd[cmd.index("-c:v") + 1], "copy")
+        self.assertEqual(cmd[cmd.index("-c:a") + 1], "aac")
+
+    def _routed_allow_remux(self, env):
+        """Run cut_video on a 7-segment EDL with the cutters stubbed; returns allow_remux."""
+        edl_file = os.path.join(self.test_dir, "rec.edl")
+        with open(edl_file, "w", encoding="utf-8") as f:
+            for i in range(6):
+                f.write(f"{i * 100 + 10}.0\t{i * 100 + 20}.0\t0\n")
+        with mock.patch.dict(os.environ, env), \
+                mock.patch.object(cut_with_edl, "plan_stream_copy", side_effect=lambda i, keep, d: keep), \
+                mock.patch.object(cut_with_edl, "cut_video_with_stream_copy", return_value=6) as copy, \
+                mock.patch.object(cut_with_edl, "cut_video_with_concat_demuxer", return_value=0) as concat:
+            rc = cut_with_edl.cut_video(self.input_file, edl_file, os.path.join(self.test_dir, "out.mkv"))
+        self.assertEqual(rc, 0)
+        self.assertEqual(copy.call_count, 0 if env["COMSKIP_COPY_MAX_DRIFT"] == "0" else 1)
+        return concat.call_args.kwargs["allow_remux"]
+
+    def test_concat_remux_is_opt_in_fallback(self):
+        """Test that the concat remux is only allowed after the opt-in stream copy failed."""
+        self.assertFalse(self._routed_allow_remux({"COMSKIP_COPY_MAX_DRIFT": "0"}))
+        self.assertTrue(self._routed_allow_remux({"COMSKIP_COPY_MAX_DRIFT": "0.5"}))
+
+    def test_encoded_list_carries_original_durations(self):
+        """Test that encoded.txt advances by the original segments' durations."""
+        self._concat_commands(False, {"COMSKIP_ENCODE_JOBS": "2"})
+        encoded = self.concat_lists["encoded.txt"].splitlines()
+        self.assertEqual(len(encoded), 3)
+        self.assertRegex(encoded[0], r"^file '.*segment_000_enc\.ts'$")
+        self.assertEqual(encoded[1], "duration 10.04")
+        # Open-ended last segment that cannot be probed: no directive needed
+        self.assertRegex(encoded[2], r"^file '.*segment_001_enc\.ts'$")
+        self.assertNotIn("duration", self.concat_lists["segments.txt"])
+
+
+class TestBatchManifest(TempDirTestCase):
+    """Test suite for the --manifest batch mode input handling."""
+
+    def test_read_manifest_skips_comments_and_blank_lines(self):
+        """Test that only job rows are returned, split on tabs."""
+        manifest = os.path.join(self.test_dir, "jobs.tsv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("# input\tedl\toutput\n\n")
+            f.write("/in/a b.ts\t/tmp/a.edl\t/out/a.mkv\r\n")
+            f.write("/in/c.ts\tnone\t/out/c.mkv\tnone\t/in/c.txt\n")
+        self.assertEqual(
+            cut_with_edl.read_manifest(manifest),
+            [
+                ["/in/a b.ts", "/tmp/a.edl", "/out/a.mkv"],
+                ["/in/c.ts", "none", "/out/c.mkv", "none", "/in/c.txt"],
+            ],
+        )
+
+    def test_missing_input_reports_exit_code(self):
+        """Test that a failing job's exit code is returned by run_manifest."""
+        manifest = os.path.join(self.test_dir, "jobs.tsv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(os.path.join(self.test_dir, "missing.ts") + "\tnone\t/tmp/out.mkv\n")
+        self.assertEqual(cut_with_edl.run_manifest(manifest, max_workers=1), 3)
+
+    def test_job_exception_does_not_abort_batch(self):
+        """Test that a job raising (log dir missing) fails alone, inline and pooled."""
+        # The input exists, so the first log write raises
+        open(os.path.join(self.test_dir, "a.ts"), "wb").close()
+        jobs = [
+            {"input_file": os.path.join(self.test_dir, "a.ts"), "edl_file": "none",
+             "output_file": "/tmp/out.mkv",
+             "log_file": os.path.join(self.test_dir, "no_such_dir", "run.log")},
+            {"input_file": os.path.join(self.test_dir, "missing.ts"),
+             "edl_file": "none", "output_file": "/tmp/out.mkv"},
+        ]
+        for workers in (1, 2):
+            with self.subTest(max_workers=workers):
+                self.assertEqual(cut_with_edl.cut_video_batch(jobs, max_workers=workers), [1, 3])
+
+    def test_jobs_file_batch(self):
+        """Test that JSON jobs run through cut_video_batch with per-job exit codes."""
+        jobs_file = os.path.join(self.test_dir, "jobs.json")
+        with open(jobs_file, "w", encoding="utf-8") as f:
+            json.dump(
+                [
+                    {"input_file": os.path.join(self.test_dir, "missing.ts"),
+                     "edl_file": "none", "output_file": "/tmp/out.mkv"},
+                    {"input_file": "x.ts", "unknown": 1},
+                ],
+                f,
+            )
+        jobs = cut_with_edl.read_jobs_file(jobs_file)
+        self.assertEqual(cut_with_edl.cut_video_batch(jobs), [3, 2])
+
+    def test_type_error_inside_cut_video_is_not_a_usage_error(self):
+        """Test that only the job's keys are validated as a usage error (exit 2)."""
+        job = {"input_file": "x.ts", "edl_file": "none", "output_file": "/tmp/out.mkv"}
+        with mock.patch.object(cut_with_edl, "_cut_video", side_effect=TypeError("boom")):
+            self.assertEqual(cut_with_edl.cut_video_batch([job]), [1])
+
+    def test_cli_batch_flags_in_any_order(self):
+        """Test that --workers before --manifest still selects batch mode."""
+        manifest = os.path.join(self.test_dir, "jobs.tsv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(os.path.join(self.test_dir, "missing.ts") + "\tnone\t/tmp/out.mkv\n")
+        script = os.path.join(os.path.dirname(__file__), "..", "src", "cut_with_edl.py")
+        result = subprocess.run(
+            [sys.executable, script, "--workers", "1", "--manifest", manifest],
+            capture_output=True, text=True, check=False,
+        )
+        self.assertEqual(result.returncode, 3, result.stderr)
+        self.assertIn("[BATCH] Exit 3", result.stderr)
+
+
+class TestAsyncCut(unittest.TestCase):
+    """Test suite for cut_videos_async with cut_video stubbed out."""
+
+    def test_jobs_run_in_threads_bounded_by_concurrency(self):
+        """Test exit codes in job order, 'none' mapping, the concurrency cap and a raising job."""
+        calls = []
+        active = [0, 0]  # current, peak
+        lock = threading.Lock()
+
+        def fake_cut_video(input_file, edl_file, output_file, srt_file, txt_file, log_file):
+            with lock:
+                calls.append((input_file, edl_file, srt_file, txt_file, log_file))
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            if input_file == "boom.ts":
+                raise RuntimeError("boom")
+            return int(input_file[0])
+
+        jobs = [
+            ("3.ts", None, "out3.mkv"),
+            ("boom.ts", "a.edl", "out.mkv"),
+            ("0.ts", "b.edl", "out0.mkv", "none", "0.txt", None),
+            ("5.ts", "c.edl", "out5.mkv"),
+        ]
+        with mock.patch.object(cut_with_edl, "cut_video", side_effect=fake_cut_video):
+            results = asyncio.run(cut_with_edl.cut_videos_async(jobs, max_concurrency=2))
+
+        self.assertEqual(results, [3, 1, 0, 5])
+        self.assertLessEqual(active[1], 2)
+        self.assertIn(("3.ts", "none", None, None, None), calls)
+        self.assertIn(("0.ts", "b.edl", None, "0.txt", None), calls)
+
+
+class TestLogSession(TempDirTestCase):
+    """Test suite for the per-call log handle used by cut_video."""
+
+    def setUp(self):
+        """Place the log file in the temporary directory."""
+        super().setUp()
+        self.log_file = os.path.join(self.test_dir, "run.log")
+
+    def test_child_output_keeps_order_with_buffered_writes(self):
+        """Test that session writes are flushed before a child appends to the log."""
+        with cut_with_edl._log_session(self.log_file):
+            with cut_with_edl._open_log(self.log_file) as f:
+                f.write("before\n")
+            cut_with_edl._run_logged([sys.executable, "-c", "print('child')"], self.log_file)
+            with cut_with_edl._open_log(self.log_file) as f:
+                f.write("after\n")
+        self.assertNotIn(self.log_file, cut_with_edl._OPEN_LOGS)
+        with open(self.log_file, encoding="utf-8") as f:
+            self.assertEqual(f.read().split(), ["before", "child", "after"])
+
+    def test_shared_session_closes_with_last_user(self):
+        """Test that an inner session on the same log does not close the outer handle."""
+        with cut_with_edl._log_session(self.log_file):
+            with cut_with_edl._log_session(self.log_file):
+                pass
+            with cut_with_edl._open_log(self.log_file) as f:
+                f.write("still open\n")
+            self.assertIn(self.log_file, cut_with_edl._OPEN_LOGS)
+        self.assertNotIn(self.log_file, cut_with_edl._OPEN_LOGS)
+        self.assertNotIn(self.log_file, cut_with_edl._OPEN_LOG_USERS)
+
+    def test_validation_errors_do_not_open_log(self):
+        """Test that return codes hold when the log cannot be opened and nothing is logged."""
+        missing_log = os.path.join(self.test_dir, "missing_dir", "run.log")
+        rc = cut_with_edl.cut_video(
+            os.path.join(self.test_dir, "missing.ts"), "none", "/tmp/out.mkv", log_file=missing_log
+        )
+        self.assertEqual(rc, 3)
+
+        input_file = os.path.join(self.test_dir, "in.ts")
+        edl_file = os.path.join(self.test_dir, "in.edl")
+        open(input_file, "wb").close()
+        with open(edl_file, "w", encoding="utf-8") as f:
+            f.write("10.0\t20.0\t0\n")
+        rc = cut_with_edl.cut_video(input_file, edl_file, "/tmp/out.mkv", log_file=self.log_file, dry_run=True)
+        self.assertEqual(rc, 0)
+        self.assertFalse(os.path.exists(self.log_file))
+
 
 if __name__ == '__main__':
     unittest.main()